@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+
+CHAVES_RESUMO = ["Ano", "Mes", "Setor", "Funcionário"]
+
+
+def _contribuicoes(df):
+    nota = pd.to_numeric(df["Nota_Lider"], errors="coerce").astype(float)
+    avaliado = nota.notna()
+    return pd.DataFrame({
+        # Registros sem data têm Ano/Mes 0: contam nos totais, mas em nenhum mês
+        "Ano": df["Ano"].astype(int),
+        "Mes": df["Mes"].astype(int),
+        "Setor": df["Setor"].astype("string").fillna(""),
+        "Funcionário": df["Funcionário"].astype("string").fillna(""),
+        "Horas": df["Horas"].astype(float),
+        "Cursos": 1,
+        "Avaliados": avaliado.astype(int),
+        "Horas_Avaliadas": df["Horas"].astype(float).where(avaliado, 0.0),
+        "Soma_Notas": nota.fillna(0.0),
+    })
+
+
+def construir_resumo(df):
+    """Totais por (Ano, Mes, Setor, Funcionário) a partir dos registros normalizados."""
+    if df.empty:
+        vazio = pd.MultiIndex.from_arrays([[]] * len(CHAVES_RESUMO), names=CHAVES_RESUMO)
+        return pd.DataFrame(columns=["Horas", "Cursos", "Avaliados", "Horas_Avaliadas", "Soma_Notas"], index=vazio)
+    return _contribuicoes(df).groupby(CHAVES_RESUMO).sum().sort_index()
+
+
+def atualizar_resumo(resumo, removidos=None, adicionados=None):
+    """Novo resumo com as linhas ``removidos`` descontadas e ``adicionados`` somadas.
+
+    O resumo recebido não é alterado: ele pode estar em uso por outras sessões.
+    """
+    novo = resumo
+    if removidos is not None and len(removidos):
+        novo = novo.sub(construir_resumo(removidos), fill_value=0)
+    if adicionados is not None and len(adicionados):
+        novo = novo.add(construir_resumo(adicionados), fill_value=0)
+    novo = novo[novo["Cursos"] > 0].astype({"Cursos": int, "Avaliados": int})
+    return novo if novo.index.is_monotonic_increasing else novo.sort_index()
+
+
+def filtrar_resumo(resumo, ano=None, mes=None, setor=None, funcionarios=None):
+    """Linhas do resumo que atendem aos filtros; ``None`` não filtra."""
+    mascara = np.ones(len(resumo), dtype=bool)
+    if ano is not None:
+        mascara &= resumo.index.get_level_values("Ano") == ano
+    if mes is not None:
+        mascara &= resumo.index.get_level_values("Mes") == mes
+    if setor is not None:
+        mascara &= resumo.index.get_level_values("Setor") == setor
+    if funcionarios is not None:
+        mascara &= resumo.index.get_level_values("Funcionário").isin(list(funcionarios))
+    return resumo[mascara]
+
+
+def media_notas(resumo):
+    avaliados = resumo["Avaliados"].sum()
+    return resumo["Soma_Notas"].sum() / avaliados if avaliados else np.nan
+
+
+SITUACOES_INATIVIDADE = ["🔴 Nunca registrou", "🔴 Crítico", "🟠 Inativo"]
+
+
+def ultimo_registro(df):
+    """Data do último treinamento de cada funcionário."""
+    ultimos = df.groupby("Funcionário", observed=True)["Data"].max()
+    ultimos.index = ultimos.index.astype(str)
+    return ultimos
+
+
+def alertas_inatividade(usuarios, ultimos, hoje, limite_dias=15):
+    """Usuários sem registro há mais de ``limite_dias``, do caso mais grave ao mais leve.
+
+    ``ultimos`` é o resultado de ``ultimo_registro``. Quem passou do dobro do
+    limite é classificado como crítico.
+    """
+    tabela = pd.DataFrame({"Usuário": usuarios["usuario"].astype(str).to_numpy(), "Setor": usuarios["setor"].to_numpy()})
+    tabela["Último Registro"] = tabela["Usuário"].map(ultimos)
+    dias = (hoje - tabela["Último Registro"]).dt.days
+    tabela["Dias sem Registro"] = dias.astype("Int64")
+    situacao = np.select(
+        [tabela["Último Registro"].isna(), dias > 2 * limite_dias, dias > limite_dias],
+        SITUACOES_INATIVIDADE,
+        default="",
+    )
+    tabela["Situação"] = pd.Categorical(situacao, categories=SITUACOES_INATIVIDADE, ordered=True)
+    alertas = tabela[tabela["Situação"].notna()]
+    return alertas.sort_values(["Situação", "Dias sem Registro"], ascending=[True, False])[
+        ["Situação", "Usuário", "Setor", "Último Registro", "Dias sem Registro"]
+    ]
@@ -0,0 +1,138 @@
+import collections
+import threading
+
+import pandas as pd
+
+# Tabelas por partição mantidas além da atual, para consultas que já tinham o nome da anterior
+VERSOES_MANTIDAS = 1
+
+_COLUNAS = ['"ID"', '"Data"', '"Funcionário"::VARCHAR AS "Funcionário"', '"Setor"::VARCHAR AS "Setor"',
+            '"Líder"::VARCHAR AS "Líder"', '"Tema"::VARCHAR AS "Tema"', '"Horas"', '"Avaliação"', '"Nota_Lider"',
+            '"Ano"', '"Mes"']
+_FILTROS = {"setor": '"Setor"', "funcionario": '"Funcionário"', "ano": '"Ano"', "mes": '"Mes"'}
+
+
+class MotorRelatorio:
+    """Banco DuckDB em memória com uma tabela colunar por partição de Treinamentos.
+
+    ``sincronizar`` copia o snapshot de uma partição (aba principal ou ano
+    arquivado) para uma tabela ordenada por Ano/Mes, só quando a versão muda;
+    assim os filtros de período descartam blocos inteiros sem ler as linhas.
+    As consultas juntam apenas as tabelas recebidas e aplicam os filtros de
+    setor, funcionário, ano e mês (valor único ou lista) dentro do banco.
+    Cada consulta usa o seu cursor, e o motor pode ser compartilhado entre
+    sessões.
+
+    Nomes de tabela guardados por quem consulta depois (como a exportação,
+    gerada só no clique) continuam valendo: uma versão que já saiu de uso é
+    trocada pela mais recente da mesma partição, e nenhuma tabela é apagada
+    enquanto uma consulta a estiver lendo.
+    """
+
+    def __init__(self):
+        import duckdb
+
+        self._con = duckdb.connect()
+        self._lock = threading.Lock()
+        self._tabelas = {}
+        self._em_uso = collections.Counter()
+        self._descartadas = []
+
+    def sincronizar(self, particao, versao, df):
+        """Nome da tabela de ``particao`` na ``versao``, criada a partir de ``df`` se ainda não existir."""
+        nome = f"treinamentos_{particao}_v{versao}"
+        with self._lock:
+            nomes = self._tabelas.setdefault(particao, [])
+            if nome in nomes:
+                return nome
+            with self._con.cursor() as cur:
+                cur.register("origem", df)
+                cur.execute(f'CREATE TABLE {nome} AS SELECT {", ".join(_COLUNAS)}, row_number() OVER () AS _ordem '
+                            f'FROM origem ORDER BY "Ano", "Mes"')
+                cur.unregister("origem")
+                nomes.append(nome)
+                while len(nomes) > VERSOES_MANTIDAS + 1:
+                    self._descartadas.append(nomes.pop(0))
+                self._apagar_descartadas(cur)
+        return nome
+
+    def _apagar_descartadas(self, cur):
+        # Chamado com o lock: só apaga as tabelas que nenhuma consulta está lendo
+        for nome in [n for n in self._descartadas if not self._em_uso[n]]:
+            cur.execute(f"DROP TABLE IF EXISTS {nome}")
+            self._descartadas.remove(nome)
+
+    def _reservar(self, tabelas):
+        """Nomes atuais de ``tabelas`` (versões descartadas viram a mais recente), marcados como em uso."""
+        with self._lock:
+            atuais = []
+            for nome in tabelas:
+                # Nome no formato de sincronizar: treinamentos_<partição>_v<versão>
+                nomes = self._tabelas.get(nome[len("treinamentos_"):nome.rfind("_v")])
+                if nomes and nome not in nomes and nome not in self._descartadas:
+                    nome = nomes[-1]
+                self._em_uso[nome] += 1
+                atuais.append(nome)
+            return atuais
+
+    def _liberar(self, tabelas):
+        with self._lock:
+            self._em_uso.subtract(tabelas)
+            self._em_uso = +self._em_uso
+            if self._descartadas:
+                with self._con.cursor() as cur:
+                    self._apagar_descartadas(cur)
+
+    def _consultar(self, sql, tabelas, filtros):
+        condicoes, parametros = [], []
+        for chave, valor in filtros.items():
+            if valor is None:
+                continue
+            # Listas (por exemplo, de anos) viram IN
+            valores = list(valor) if isinstance(valor, (list, tuple)) else [valor]
+            condicoes.append(f"{_FILTROS[chave]} IN ({', '.join('?' * len(valores))})")
+            parametros.extend(valores)
+        onde = f" WHERE {' AND '.join(condicoes)}" if condicoes else ""
+        tabelas = self._reservar(tabelas)
+        try:
+            # A posição da partição na lista mantém a ordem original dos registros entre tabelas
+            origem = " UNION ALL ".join(f"SELECT *, {i} AS _particao FROM {nome}" for i, nome in enumerate(tabelas))
+            with self._con.cursor() as cur:
+                return cur.execute(f"WITH registros AS (SELECT * FROM ({origem}){onde}) {sql}", parametros).df()
+        finally:
+            self._liberar(tabelas)
+
+    def registros(self, tabelas, **filtros):
+        """Registros que atendem aos filtros, na ordem da planilha e indexados pelo ID."""
+        df = self._consultar('SELECT * EXCLUDE (_ordem, _particao) FROM registros ORDER BY _particao, _ordem',
+                             tabelas, filtros)
+        df.index = df["ID"].to_numpy()
+        return df
+
+    def funcionarios(self, tabelas, **filtros):
+        df = self._consultar('SELECT DISTINCT "Funcionário" FROM registros WHERE "Funcionário" <> \'\' '
+                             'ORDER BY "Funcionário"', tabelas, filtros)
+        return df["Funcionário"].tolist()
+
+    def totais(self, tabelas, **filtros):
+        """Total de cursos, carga horária e média das notas do líder."""
+        linha = self._consultar('SELECT count(*), coalesce(sum("Horas"), 0), avg("Nota_Lider") FROM registros',
+                                tabelas, filtros).iloc[0]
+        return int(linha.iloc[0]), float(linha.iloc[1]), float(linha.iloc[2]) if pd.notna(linha.iloc[2]) else float("nan")
+
+    def horas_setor_mes(self, tabelas, **filtros):
+        return self._consultar('SELECT "Ano", "Mes", "Setor", sum("Horas") AS "Horas" FROM registros '
+                               'WHERE "Ano" > 0 GROUP BY ALL ORDER BY ALL', tabelas, filtros)
+
+    def distribuicao_notas_lider(self, tabelas, **filtros):
+        return self._consultar('SELECT "Nota_Lider" AS "Nota", count(*) AS "Registros" FROM registros '
+                               'WHERE "Nota_Lider" IS NOT NULL GROUP BY ALL ORDER BY ALL', tabelas, filtros)
+
+    def top_temas(self, tabelas, n=10, **filtros):
+        return self._consultar(f'SELECT "Tema", sum("Horas") AS "Horas", count(*) AS "Cursos" FROM registros '
+                               f'GROUP BY ALL ORDER BY "Horas" DESC, "Tema" LIMIT {int(n)}', tabelas, filtros)
+
+    def tendencia(self, tabelas, **filtros):
+        """Horas e cursos por (Ano, Mes), para comparar o mesmo mês entre anos."""
+        return self._consultar('SELECT "Ano", "Mes", sum("Horas") AS "Horas", count(*) AS "Cursos" FROM registros '
+                               'WHERE "Ano" > 0 GROUP BY ALL ORDER BY ALL', tabelas, filtros)
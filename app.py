@@ -3,10 +3,24 @@ import pandas as pd
 import os
 from datetime import datetime
 import plotly.express as px
-import ast
 import locale
-import io
-from streamlit_gsheets import GSheetsConnection
+from analitico import MotorRelatorio
+from cache_dados import SnapshotCache
+from desempenho import BackendMedido, Desempenho, percentis
+from fila_gravacao import CAMINHO_DIARIO_PADRAO, FilaGravacao
+from armazenamento import ArquivoSomenteLeitura, ConflitoEdicao, anos_dos_registros, criar_backend, novo_id
+from agregados import alertas_inatividade, construir_resumo, filtrar_resumo, ultimo_registro
+from formatacao import formatar_horas, notas_para_texto
+from exportacao import FORMATOS, gerar_exportacao
+from importacao import COLUNAS_IMPORTACAO, chaves_registros, relatorio_erros, validar_importacao
+from esquema import indexar_periodos, normalizar_treinamentos, registros_do_periodo
+from consultas import (funcionarios_da_equipe, horas_dashboard, horas_por_tema,
+                       ler_arquivo_treinamentos, ler_treinamentos, ler_usuarios, mesclar_treinamentos,
+                       metas_por_colaborador, pares_setor_funcionario, registros_dashboard,
+                       sincronizar_treinamentos)
+from constantes import (LIMITE_INATIVIDADE, LISTA_LIDERES, LISTA_MESES, LISTA_NOTAS_CADASTRO, LISTA_PERFIS,
+                        LISTA_SETORES, META_HORAS_MES)
+from usuarios import Diretorio, gerar_hash
 
 # --- CONFIGURAÇÃO REGIONAL (PT-BR) ---
 try:
@@ -20,27 +34,262 @@ except:
 # --- 1. CONFIGURAÇÃO E CONEXÃO ---
 st.set_page_config(page_title="Barbosa Contabilidade | Treinamentos", layout="wide")
 
-conn = st.connection("gsheets", type=GSheetsConnection)
-
-def carregar_dados():
-    df = conn.read(worksheet="Treinamentos", ttl=0)
-    if df.empty or len(df.columns) < 2:
-        return pd.DataFrame(columns=["Data", "Funcionário", "Setor", "Líder", "Tema", "Horas", "Avaliação", "Nota_Lider"])
-    
-    df["Nota_Lider"] = df["Nota_Lider"].astype(str).replace(['nan', 'None', '', 'nan.0'], '-')
-    df["Avaliação"] = df["Avaliação"].astype(str).replace(['nan', 'None', ''], '-')
-    df["Data"] = pd.to_datetime(df["Data"], dayfirst=True, errors='coerce')
-    df["Horas"] = pd.to_numeric(df["Horas"], errors='coerce').fillna(0)
-    return df
-
+# Medições de tempo por rerun (aba "Desempenho" do painel); DESEMPENHO_ARQUIVO grava também em JSON lines
+@st.cache_resource
+def obter_desempenho():
+    return Desempenho(int(os.environ.get("DESEMPENHO_CAPACIDADE", "5000")), os.environ.get("DESEMPENHO_ARQUIVO"))
+
+desempenho = obter_desempenho()
+# Um rerun interrompido por st.rerun() fica pendente na sessão e é registrado no início do próximo
+st.session_state._rerun_desempenho = desempenho.iniciar(st.session_state.get("_rerun_desempenho"))
+
+# Vencido o TTL, Treinamentos é atualizado só com as linhas alteradas; a aba inteira é relida
+# a cada RECONCILIAR_SEGUNDOS para pegar edições feitas direto na planilha
+@st.cache_resource
+def obter_snapshots():
+    return SnapshotCache(ttl_segundos=float(os.environ.get("CACHE_TTL_SEGUNDOS", "60")),
+                         reconciliar_segundos=float(os.environ.get("RECONCILIAR_SEGUNDOS", "900")))
+
+snapshots = obter_snapshots()
+
+# Planilha Google (padrão) ou banco local: ARMAZENAMENTO=gsheets|sqlite
+@st.cache_resource
+def obter_backend():
+    return criar_backend()
+
+# Gravações saem do rerun: vão para um diário local e uma thread as envia em lote, com novas
+# tentativas quando a planilha recusa por cota. Se uma gravação for rejeitada, o snapshot
+# (que já mostrava a alteração) é descartado para a aba ser relida
+@st.cache_resource
+def obter_fila_gravacao():
+    return FilaGravacao(BackendMedido(obter_backend(), desempenho),
+                        os.environ.get("FILA_GRAVACAO_DIARIO", CAMINHO_DIARIO_PADRAO),
+                        ao_falhar=lambda op, erro: snapshots.invalidar(op["aba"]))
+
+backend = obter_fila_gravacao()
+
+# Memória do rerun atual: o script é reexecutado a cada interação, então o dicionário recomeça vazio
+_memo_rerun = {}
+
+def _ler_aba(aba, carregar, atualizar=None, ttl=None):
+    if aba not in _memo_rerun:
+        _memo_rerun[aba] = snapshots.obter(aba, carregar, atualizar, ttl)
+    return _memo_rerun[aba]
+
+# Partições de Treinamentos: os anos encerrados ficam em arquivos somente leitura (python migrar.py
+# arquivar), carregados só quando algum filtro pede aquele ano; o restante fica na aba principal
+TTL_ARQUIVO_SEGUNDOS = 3600
+
+def anos_arquivados():
+    return _ler_aba("Treinamentos:arquivados", lambda: backend.anos_arquivados("Treinamentos")).df
+
+def _snapshot_arquivo(ano):
+    return _ler_aba(f"Treinamentos:{ano}", lambda: ler_arquivo_treinamentos(backend, ano), ttl=TTL_ARQUIVO_SEGUNDOS)
+
+def _ler_treinamentos():
+    return ler_treinamentos(backend, anos_arquivados())
+
+def _sincronizar_treinamentos(snap):
+    resultado = sincronizar_treinamentos(backend, snap.df, snap.derivado("resumo_mensal", construir_resumo), anos_arquivados())
+    if resultado is None or resultado[0] is snap.df:
+        return resultado
+    return resultado[0], {"resumo_mensal": resultado[1]}
+
+def _snapshot_treinamentos():
+    return _ler_aba("Treinamentos", _ler_treinamentos, _sincronizar_treinamentos)
+
+def _particoes(anos=None):
+    """Snapshots das partições que cobrem ``anos`` (None: todas), por nome da partição."""
+    arquivados = anos_arquivados()
+    partes = {str(ano): _snapshot_arquivo(ano) for ano in arquivados if anos is None or ano in anos}
+    if anos is None or any(ano not in arquivados for ano in anos):
+        partes["principal"] = _snapshot_treinamentos()
+    return partes
+
+# Junção de várias partições, guardada no snapshot mais recente enquanto nenhuma delas mudar
+def _juntar(partes, anos, nome, calcular, juntar):
+    if len(partes) == 1:
+        return partes[0].derivado(nome, calcular)
+    valores = [p.derivado(nome, calcular) for p in partes]
+    chave = (nome, tuple(anos or ()), tuple(p.versao for p in partes))
+    return partes[-1].derivado(chave, lambda _: juntar(valores))
+
+def _juntar_resumos(resumos):
+    return pd.concat(resumos).sort_index()
+
+def _ler_usuarios():
+    return ler_usuarios(backend)
+
+# Os DataFrames retornados são compartilhados entre sessões: use .copy() antes de alterar
+@desempenho.medido("carregar_usuarios")
 def carregar_usuarios():
-    return conn.read(worksheet="Usuarios", ttl=0)
-
-def salvar_dados(df_atualizado):
-    conn.update(worksheet="Treinamentos", data=df_atualizado)
-
-def salvar_usuarios(df_usuarios):
-    conn.update(worksheet="Usuarios", data=df_usuarios)
+    return _ler_aba("Usuarios", _ler_usuarios).df
+
+# Usuários indexados pelo nome (perfis já interpretados), remontados só quando a aba Usuarios muda
+@desempenho.medido("diretorio")
+def carregar_diretorio():
+    return _ler_aba("Usuarios", _ler_usuarios).derivado("diretorio", Diretorio)
+
+# Totais por (Ano, Mes, Setor, Funcionário), mantidos junto do snapshot de Treinamentos
+@desempenho.medido("resumo_mensal")
+def carregar_resumo_mensal(anos=None):
+    return _juntar(list(_particoes(anos).values()), anos, "resumo_mensal", construir_resumo, _juntar_resumos)
+
+# Equipe do gestor: quem tem registro em qualquer ano, não só no ano do Dashboard. Cada partição guarda
+# os seus pares (Setor, Funcionário); só a união, pequena, é refeita quando a aba principal muda
+@desempenho.medido("equipes")
+def carregar_equipes():
+    return _juntar(list(_particoes().values()), None, "equipes", pares_setor_funcionario,
+                   lambda partes: frozenset().union(*partes))
+
+# Relatório Geral consultado no DuckDB: cada partição vira uma tabela, recriada quando o snapshot muda
+@st.cache_resource
+def obter_motor_relatorio():
+    return MotorRelatorio()
+
+motor_relatorio = obter_motor_relatorio()
+
+@desempenho.medido("tabelas_relatorio")
+def tabelas_relatorio(anos=None):
+    return tuple(motor_relatorio.sincronizar(nome, snap.versao, snap.df) for nome, snap in _particoes(anos).items())
+
+# Arquivos de relatório guardados por tabelas (versões) + filtros; os registros (_registros) só são
+# consultados quando o arquivo ainda não está no cache
+@st.cache_data(max_entries=16, show_spinner=False)
+def exportar_relatorio(tabelas, filtros, formato, _registros):
+    return gerar_exportacao(_registros(), formato)
+
+# Data do último treinamento de cada funcionário, calculada uma vez por versão do snapshot
+# Quem não aparece na aba principal é procurado nos arquivos, do ano mais recente para o mais antigo
+@desempenho.medido("ultimos_registros")
+def carregar_ultimos_registros(usuarios=()):
+    ultimos = _snapshot_treinamentos().derivado("ultimo_registro", ultimo_registro)
+    faltam = set(usuarios) - set(ultimos.index)
+    for ano in reversed(anos_arquivados()):
+        if not faltam:
+            break
+        do_ano = _snapshot_arquivo(ano).derivado("ultimo_registro", ultimo_registro)
+        do_ano = do_ano[do_ano.index.isin(faltam)]
+        ultimos = pd.concat([ultimos, do_ano])
+        faltam -= set(do_ano.index)
+    return ultimos
+
+def _snapshot_do_ano(ano):
+    return _snapshot_arquivo(ano) if ano in anos_arquivados() else _snapshot_treinamentos()
+
+# Registros de um único mês: só a partição do ano é lida, recortada pelo índice (Ano, Mes)
+@desempenho.medido("carregar_periodo")
+def carregar_periodo(ano, mes):
+    snap = _snapshot_do_ano(ano)
+    return registros_do_periodo(snap.df, snap.derivado("indice_periodos", indexar_periodos), ano, mes)
+
+def versao_periodo(ano):
+    return ("arquivo" if ano in anos_arquivados() else "principal", _snapshot_do_ano(ano).versao)
+
+# Figuras do Dashboard guardadas já como dicionário (o JSON do Plotly), por versão dos dados + filtros;
+# os registros (_registros) não entram na chave. Os dados chegam agregados, com temas e colaboradores
+# limitados (o restante em "Outros"), então o tamanho da figura não depende do número de registros
+@st.cache_data(max_entries=64, show_spinner=False)
+def grafico_temas(versao, filtros, por_funcionario, cor, _registros):
+    dados = horas_por_tema(_registros, por_funcionario)
+    fig = px.bar(dados, x="Tema", y="Horas", color="Funcionário" if por_funcionario else None, template="plotly_dark",
+                 category_orders={col: list(dados[col].cat.categories) for col in dados.columns if col != "Horas"},
+                 color_discrete_sequence=px.colors.qualitative.Pastel if por_funcionario else [cor])
+    fig.update_traces(width=0.4)
+    return fig.to_dict()
+
+# O donut só depende das duas contagens
+@st.cache_data(max_entries=64, show_spinner=False)
+def grafico_metas(bateu, pendente):
+    fig = px.pie(values=[bateu, pendente], names=['Bateu Meta', 'Pendente'],
+                 hole=0.6, color=['Bateu Meta', 'Pendente'],
+                 color_discrete_map={'Bateu Meta':'#00ff00', 'Pendente':'#ff4b4b'},
+                 title="Panorama da Equipe")
+    fig.update_layout(showlegend=False, height=220, margin=dict(t=30, b=0, l=0, r=0), template="plotly_dark")
+    return fig.to_dict()
+
+# Após gravar um registro de Treinamentos, aplica a mesma alteração no snapshot e no resumo
+# mensal em vez de reler a aba; nos demais casos o snapshot é apenas invalidado
+def _apos_gravar(aba, id_registro=None, campos=None, adicionados=None):
+    _memo_rerun.pop(aba, None)
+    base = snapshots.atual(aba)
+    if (aba != "Treinamentos" or base is None or base.df.empty
+            or (id_registro is None and adicionados is None)
+            or (id_registro is not None and id_registro not in base.df.index)):
+        snapshots.invalidar(aba)
+        return
+
+    resumo = base.derivado("resumo_mensal", construir_resumo)
+    if adicionados is not None:
+        df, resumo = mesclar_treinamentos(base.df, resumo, normalizar_treinamentos(adicionados.copy()))
+    elif campos is None:
+        df, resumo = mesclar_treinamentos(base.df, resumo, removidos=[id_registro])
+    else:
+        novo = base.df.loc[[id_registro]].copy()
+        for col, valor in campos.items(): novo[col] = valor
+        novo["Versao"] += 1
+        df, resumo = mesclar_treinamentos(base.df, resumo, normalizar_treinamentos(novo))
+    snapshots.publicar(aba, base, df, {"resumo_mensal": resumo})
+
+def _origem():
+    return st.session_state.get("usuario")
+
+# A planilha confere a Versao só quando a fila envia; aqui o conflito aparece na hora para quem
+# editou uma versão que o snapshot já substituiu
+def _conferir_versao(aba, id_registro, versao):
+    if aba == "Treinamentos":
+        for ano in anos_arquivados():
+            arquivo = snapshots.atual(f"Treinamentos:{ano}")
+            if arquivo is not None and id_registro in arquivo.df.index:
+                raise ArquivoSomenteLeitura(f"Os registros de {ano} estão arquivados e não podem ser alterados.")
+    base = snapshots.atual(aba)
+    if versao is None or base is None or "ID" not in base.df.columns:
+        return
+    atual = base.df.loc[base.df["ID"].astype(str) == str(id_registro), "Versao"]
+    if atual.empty:
+        raise ConflitoEdicao("O registro foi excluído por outro usuário.")
+    if int(atual.iloc[0]) != int(versao):
+        raise ConflitoEdicao("O registro foi alterado por outro usuário. Recarregue e tente novamente.")
+
+# Gravações por linha: só o registro afetado vai para a planilha, conferindo a Versao lida
+@desempenho.medido("salvar_insercao")
+def inserir_registros(aba, df_novos):
+    if aba == "Treinamentos":
+        _conferir_anos_abertos(df_novos)
+    backend.append_rows(aba, df_novos, origem=_origem())
+    _apos_gravar(aba, adicionados=df_novos)
+
+def _conferir_anos_abertos(df_novos):
+    fechados = sorted(set(anos_dos_registros(df_novos)) & set(anos_arquivados()))
+    if fechados:
+        raise ArquivoSomenteLeitura(f"O ano {fechados[0]} já foi arquivado e não aceita novos registros.")
+
+# Importação em massa: um append por lote para a fila, e o snapshot é atualizado uma única vez no fim
+@desempenho.medido("salvar_importacao")
+def importar_registros(resultado, progresso=None):
+    _conferir_anos_abertos(resultado.registros)
+    gravados = 0
+    for lote in resultado.lotes():
+        backend.append_rows("Treinamentos", lote, origem=_origem())
+        gravados += len(lote)
+        if progresso: progresso(gravados / len(resultado.registros))
+    _apos_gravar("Treinamentos", adicionados=resultado.registros)
+
+# Chaves de duplicidade da aba principal, por versão; anos arquivados não aceitam importação
+def chaves_existentes():
+    return _snapshot_treinamentos().derivado("chaves_importacao", lambda df: frozenset(chaves_registros(df)))
+
+@desempenho.medido("salvar_atualizacao")
+def atualizar_registro(aba, id_registro, campos, versao=None):
+    _conferir_versao(aba, id_registro, versao)
+    backend.update_row(aba, id_registro, campos, versao, origem=_origem())
+    _apos_gravar(aba, id_registro=id_registro, campos=campos)
+
+@desempenho.medido("salvar_exclusao")
+def excluir_registro(aba, id_registro, versao=None):
+    _conferir_versao(aba, id_registro, versao)
+    backend.delete_row(aba, id_registro, versao, origem=_origem())
+    _apos_gravar(aba, id_registro=id_registro)
 
 # --- UTILITÁRIOS ---
 def format_to_time(decimal_hours):
@@ -51,19 +300,15 @@ def format_to_time(decimal_hours):
     if minutes == 60: minutes = 0; hours += 1
     return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
 
-def converter_perfil(perfil_raw):
-    try:
-        res = ast.literal_eval(str(perfil_raw))
-        return res if isinstance(res, list) else [str(perfil_raw)]
-    except:
-        return [str(perfil_raw)]
+# Os perfis da sessão ficam num frozenset: cada verificação é uma consulta O(1)
+def tem_perfil(*perfis):
+    return not st.session_state.perfil.isdisjoint(perfis)
 
-# --- CONSTANTES ---
-LISTA_SETORES = ["Selecione o Setor...", "Departamento T.I.", "Departamento Pessoal", "Departamento Fiscal", "Departamento Contábil", "Diretoria", "Departamento R.H.", "Departamento Legalização", "Departamento Recepção"]
-LISTA_LIDERES = ["Selecione o Líder...", "Victor Souza", "Thiago Ferreira", "Rafael Pires", "Priscila Barbosa", "Franceli Dario", "Thamiris Afonso", "Ruth Moreira"]
-LISTA_MESES = ["Janeiro", "Fevereiro", "Março", "Abril", "Maio", "Junho", "Julho", "Agosto", "Setembro", "Outubro", "Novembro", "Dezembro"]
-LISTA_NOTAS_VALIDAS = [str(i) for i in range(1, 11)]
-LISTA_NOTAS_CADASTRO = ["Selecione..."] + LISTA_NOTAS_VALIDAS
+def ve_todos_setores():
+    return "Admin" in st.session_state.perfil or st.session_state.setor_usuario == "Diretoria"
+
+# Filtro de avaliação do Dashboard -> parâmetro ``avaliados`` de consultas
+STATUS_AVALIACAO = {"Todos": None, "✅ Avaliados": True, "⏳ Pendentes": False}
 
 # --- ESTADOS DE SESSÃO ---
 if 'autenticado' not in st.session_state:
@@ -89,13 +334,13 @@ if not st.session_state.autenticado:
         u_in = st.text_input("Seu Nome de Usuário", placeholder="Ex: Matheus Oliveira")
         s_in = st.text_input("Senha de Acesso", type="password")
         if st.button("LOGIN"):
-            users_df = carregar_usuarios()
-            user_auth = users_df[(users_df['usuario'] == u_in) & (users_df['senha'].astype(str) == s_in)]
-            if not user_auth.empty:
+            diretorio_login = carregar_diretorio()
+            with desempenho.medir("login"): user_auth = diretorio_login.autenticar(u_in, s_in)
+            if user_auth is not None:
                 st.session_state.autenticado = True
-                st.session_state.usuario = u_in
-                st.session_state.perfil = converter_perfil(user_auth.iloc[0]['perfil'])
-                st.session_state.setor_usuario = user_auth.iloc[0]['setor']
+                st.session_state.usuario = user_auth.nome
+                st.session_state.perfil = user_auth.perfis
+                st.session_state.setor_usuario = user_auth.setor
                 st.rerun()
             else: st.error("Credenciais incorretas.")
 
@@ -111,16 +356,28 @@ else:
         .metric-card { background-color: rgba(255, 255, 255, 0.05); padding: 20px; border-radius: 15px; text-align: center; border-bottom: 4px solid #ff4b4b; transition: transform 0.3s; margin-bottom: 10px;}
         .metric-label { color: #aaaaaa; font-size: 14px; text-transform: uppercase; letter-spacing: 1px; margin-bottom: 10px; }
         .metric-value { color: white; font-size: 28px; font-weight: 800; }
-        .inactive-alert { border-left: 5px solid #ff4b4b; background-color: rgba(255, 75, 75, 0.1); padding: 15px; border-radius: 5px; margin-bottom: 10px; font-size: 14px; }
         </style>
     """, unsafe_allow_html=True)
     
-    df = carregar_dados()
+    # Perfis e setor são relidos do diretório a cada rerun: alterações do administrador valem na hora,
+    # e quem foi excluído ou renomeado sai da sessão
+    eu = carregar_diretorio().get(st.session_state.usuario)
+    if eu is None:
+        st.session_state.autenticado = False
+        st.rerun()
+    st.session_state.perfil, st.session_state.setor_usuario = eu.perfis, eu.setor
+
+    for falha in backend.falhas_de(st.session_state.usuario):
+        st.warning(f"Uma alteração sua em {falha['aba']} não foi gravada: {falha['erro']}")
+
+    # Só a aba principal (anos em aberto): as páginas leem os anos arquivados que os filtros pedirem
+    df = _snapshot_treinamentos().df
     opcoes_menu = ["Dashboard", "Registrar Curso", "Relatório Geral"]
-    if any(p in st.session_state.perfil for p in ["Admin", "Editor"]): 
+    if tem_perfil("Admin", "Editor"): 
         opcoes_menu.append("Painel Administrativo")
     
     menu = st.sidebar.selectbox("Menu", opcoes_menu)
+    st.session_state._rerun_desempenho.pagina = menu
     st.sidebar.divider()
     st.sidebar.write(f"👤 **{st.session_state.usuario}**")
     st.sidebar.write(f"🏢 Setor: **{st.session_state.setor_usuario}**")
@@ -132,10 +389,10 @@ else:
             conf_senha = st.text_input("Confirmar Senha", type="password")
             if st.form_submit_button("ATUALIZAR"):
                 if nova_senha == conf_senha and nova_senha != "":
-                    u_df = carregar_usuarios()
-                    u_df.loc[u_df['usuario'] == st.session_state.usuario, 'senha'] = nova_senha
-                    salvar_usuarios(u_df)
-                    st.success("Senha alterada!")
+                    try:
+                        atualizar_registro("Usuarios", eu.id, {"senha": gerar_hash(nova_senha)})
+                        st.success("Senha alterada!")
+                    except ConflitoEdicao as e: st.error(str(e))
                 else: st.error("As senhas não coincidem.")
 
     # --- LÓGICA DASHBOARD ---
@@ -147,16 +404,15 @@ else:
         titulo_dash = f"MEU DASHBOARD - {mes_sel.upper()}"
         status_filtro_radio = "Todos"
 
-        if any(p in st.session_state.perfil for p in ["Gestor", "Admin"]):
+        if tem_perfil("Gestor", "Admin"):
             st.sidebar.divider()
-            df_base_filtros = df.copy()
-            if "Admin" in st.session_state.perfil or st.session_state.setor_usuario == "Diretoria":
+            if ve_todos_setores():
                 setor_f = st.sidebar.selectbox("Filtrar por Setor:", ["Todos"] + LISTA_SETORES[1:])
-                if setor_f != "Todos": df_base_filtros = df_base_filtros[df_base_filtros["Setor"] == setor_f]
+                setor_filtro = None if setor_f == "Todos" else setor_f
             else:
-                df_base_filtros = df_base_filtros[df_base_filtros["Setor"] == st.session_state.setor_usuario]
+                setor_filtro = st.session_state.setor_usuario
             
-            colaboradores_lista = sorted(df_base_filtros["Funcionário"].unique().tolist())
+            colaboradores_lista = funcionarios_da_equipe(carregar_equipes(), setor_filtro)
             f_colabs = st.sidebar.multiselect("Filtrar Colaboradores:", colaboradores_lista)
             status_filtro_radio = st.sidebar.radio("Status de Avaliação:", ["Todos", "✅ Avaliados", "⏳ Pendentes"])
             
@@ -164,25 +420,22 @@ else:
                 target_users = f_colabs
                 titulo_dash = f"DASHBOARD: {f_colabs[0].upper()}" if len(f_colabs) == 1 else "DASHBOARD GRUPAL"
             else:
-                target_users = colaboradores_lista if not df_base_filtros.empty else [st.session_state.usuario]
+                target_users = colaboradores_lista if colaboradores_lista else [st.session_state.usuario]
 
-        if df.empty or df["Data"].isnull().all():
+        if (df.empty or df["Data"].isnull().all()) and not anos_arquivados():
             st.info("Nenhum dado encontrado para o período.")
         else:
-            # Filtragem principal
-            user_df = df[(df["Funcionário"].isin(target_users)) & 
-                         (df["Data"].dt.month == (LISTA_MESES.index(mes_sel)+1)) & 
-                         (df["Data"].dt.year == ano_sel)].copy()
-            
-            # Filtro por avaliação do líder
-            user_df["Nota_Lider_Str"] = user_df["Nota_Lider"].apply(lambda x: str(x).replace('.0', ''))
-            if status_filtro_radio == "✅ Avaliados":
-                user_df = user_df[user_df["Nota_Lider_Str"].isin(LISTA_NOTAS_VALIDAS)]
-            elif status_filtro_radio == "⏳ Pendentes":
-                user_df = user_df[~user_df["Nota_Lider_Str"].isin(LISTA_NOTAS_VALIDAS)]
-            
-            horas_totais = user_df["Horas"].sum()
-            meta_dinamica = 7.0 * (len(target_users) if target_users else 1)
+            mes_num = LISTA_MESES.index(mes_sel)+1
+            resumo_mensal, periodo = carregar_resumo_mensal([ano_sel]), carregar_periodo(ano_sel, mes_num)
+            arquivado = ano_sel in anos_arquivados()
+
+            # Filtragem principal (com o filtro por avaliação do líder)
+            with desempenho.medir("filtros_dashboard"):
+                resumo_mes = filtrar_resumo(resumo_mensal, ano=ano_sel, mes=mes_num)
+                avaliados = STATUS_AVALIACAO[status_filtro_radio]
+                user_df = registros_dashboard(periodo, target_users, avaliados)
+                horas_totais = horas_dashboard(resumo_mes, target_users, avaliados)
+            meta_dinamica = META_HORAS_MES * (len(target_users) if target_users else 1)
 
             # Lógica de cores baseada na meta
             if horas_totais < (meta_dinamica * 0.4): cor_card, cor_graf = "linear-gradient(135deg, #ff0000 0%, #8b0000 100%)", "#ff4b4b"
@@ -200,30 +453,17 @@ else:
             c4.metric("STATUS", "EM DIA" if horas_totais >= meta_dinamica else "PENDENTE")
 
             # --- SEÇÃO GESTOR: META 7H INDIVIDUAL ---
-            if any(p in st.session_state.perfil for p in ["Gestor", "Admin"]):
+            if tem_perfil("Gestor", "Admin"):
                 st.divider()
                 st.subheader("🚩 Status de Cumprimento (Meta 7h/Colaborador)")
-                udf_meta = carregar_usuarios()
-                if not ("Admin" in st.session_state.perfil or st.session_state.setor_usuario == "Diretoria"):
-                    udf_meta = udf_meta[udf_meta["setor"] == st.session_state.setor_usuario]
-                
-                todos_colabs = udf_meta["usuario"].unique()
-                df_mes_meta = df[(df["Data"].dt.month == (LISTA_MESES.index(mes_sel)+1)) & (df["Data"].dt.year == ano_sel)]
-                horas_por_colab = df_mes_meta.groupby("Funcionário")["Horas"].sum().reindex(todos_colabs, fill_value=0).reset_index()
-                horas_por_colab.columns = ["Nome", "Total_Horas"]
+                equipe = carregar_diretorio().nomes(None if ve_todos_setores() else st.session_state.setor_usuario)
                 
-                bateu_meta = horas_por_colab[horas_por_colab["Total_Horas"] >= 7.0]
-                pendente_meta = horas_por_colab[horas_por_colab["Total_Horas"] < 7.0]
+                with desempenho.medir("metas_equipe"):
+                    bateu_meta, pendente_meta = metas_por_colaborador(resumo_mes, equipe)
                 
                 m1, m2 = st.columns([1, 2])
-                with m1:
-                    fig_meta = px.pie(values=[len(bateu_meta), len(pendente_meta)], 
-                                      names=['Bateu Meta', 'Pendente'], 
-                                      hole=0.6, color=['Bateu Meta', 'Pendente'],
-                                      color_discrete_map={'Bateu Meta':'#00ff00', 'Pendente':'#ff4b4b'},
-                                      title="Panorama da Equipe")
-                    fig_meta.update_layout(showlegend=False, height=220, margin=dict(t=30, b=0, l=0, r=0), template="plotly_dark")
-                    st.plotly_chart(fig_meta, use_container_width=True)
+                with m1, desempenho.medir("grafico_metas"):
+                    st.plotly_chart(grafico_metas(len(bateu_meta), len(pendente_meta)), use_container_width=True)
                 
                 with m2:
                     cl1, cl2 = st.columns(2)
@@ -233,7 +473,7 @@ else:
                     with cl2:
                         with st.expander(f"⏳ PENDENTES ({len(pendente_meta)})", expanded=True):
                             for _, r in pendente_meta.iterrows():
-                                falta = 7.0 - r['Total_Horas']
+                                falta = META_HORAS_MES - r['Total_Horas']
                                 st.write(f"❌ {r['Nome']} (-{format_to_time(falta)})")
 
             # --- GRÁFICOS E EDIÇÃO ---
@@ -242,11 +482,10 @@ else:
             with cg1:
                 st.subheader("Distribuição por Temas")
                 if not user_df.empty:
-                    cor_param = "Funcionário" if len(target_users) > 1 else None
-                    fig = px.bar(user_df, x="Tema", y="Horas", color=cor_param, template="plotly_dark", 
-                                 color_discrete_sequence=[cor_graf] if not cor_param else px.colors.qualitative.Pastel)
-                    fig.update_traces(width=0.4) 
-                    st.plotly_chart(fig, use_container_width=True)
+                    with desempenho.medir("grafico_temas"):
+                        filtros_graf = (ano_sel, mes_num, tuple(target_users), status_filtro_radio)
+                        fig = grafico_temas(versao_periodo(ano_sel), filtros_graf, len(target_users) > 1, cor_graf, user_df)
+                        st.plotly_chart(fig, use_container_width=True)
             
             with cg2:
                 st.subheader("Ajustar Registro")
@@ -259,14 +498,16 @@ else:
                     sou_gestor = "Gestor" in st.session_state.perfil
                     eh_meu = (func_reg == st.session_state.usuario)
                     
-                    pode_excluir = eh_meu or sou_adm
-                    pode_editar = eh_meu or sou_adm or sou_gestor
+                    pode_excluir = (eh_meu or sou_adm) and not arquivado
+                    pode_editar = (eh_meu or sou_adm or sou_gestor) and not arquivado
+                    if arquivado: st.caption(f"🔒 {ano_sel} está arquivado: registros somente leitura.")
 
                     col_b1, col_b2 = st.columns(2)
                     if col_b1.button("❌ EXCLUIR", disabled=not pode_excluir, use_container_width=True):
-                        df_exc = carregar_dados()
-                        df_exc = df_exc.drop(sel_id)
-                        salvar_dados(df_exc); st.rerun()
+                        try:
+                            excluir_registro("Treinamentos", sel_id, user_df.loc[sel_id, 'Versao'])
+                            st.rerun()
+                        except ConflitoEdicao as e: st.error(str(e))
                     
                     if col_b2.button("📝 EDITAR", disabled=not pode_editar, use_container_width=True):
                         st.session_state.editando_id = sel_id
@@ -277,14 +518,14 @@ else:
                             trava_colab = not (eh_meu or sou_adm)
                             novo_tema = st.text_input("Tema", value=user_df.loc[sel_id, 'Tema'], disabled=trava_colab)
                             
-                            n_c_raw = str(user_df.loc[sel_id, 'Avaliação']).replace('.0', '')
-                            idx_c = LISTA_NOTAS_CADASTRO.index(n_c_raw) if n_c_raw in LISTA_NOTAS_CADASTRO else 0
+                            n_c = user_df.loc[sel_id, 'Avaliação']
+                            idx_c = LISTA_NOTAS_CADASTRO.index(str(n_c)) if pd.notna(n_c) else 0
                             nova_nota_c = st.selectbox("Sua Satisfação", LISTA_NOTAS_CADASTRO, index=idx_c, disabled=trava_colab)
                             
                             # Avaliação do Líder (Apenas Gestores avaliam o registro de outros)
                             pode_dar_nota_lider = (sou_gestor or sou_adm) and not eh_meu
-                            n_l_raw = str(user_df.loc[sel_id, 'Nota_Lider']).replace('.0', '')
-                            idx_l = LISTA_NOTAS_CADASTRO.index(n_l_raw) if n_l_raw in LISTA_NOTAS_CADASTRO else 0
+                            n_l = user_df.loc[sel_id, 'Nota_Lider']
+                            idx_l = LISTA_NOTAS_CADASTRO.index(str(n_l)) if pd.notna(n_l) else 0
                             nova_nota_l = st.selectbox("Avaliação Líder (Privada)", LISTA_NOTAS_CADASTRO, index=idx_l, disabled=not pode_dar_nota_lider)
 
                             h_dec = user_df.loc[sel_id, 'Horas']
@@ -297,24 +538,25 @@ else:
                             ns = ec3.number_input("S", 0, 59, s_ed, disabled=trava_colab)
 
                             if st.form_submit_button("SALVAR"):
-                                df_b = carregar_dados()
-                                df_b.loc[sel_id, ["Tema", "Horas", "Avaliação", "Nota_Lider"]] = [novo_tema, nh + (nm/60) + (ns/3600), nova_nota_c, nova_nota_l]
-                                salvar_dados(df_b)
-                                del st.session_state.editando_id; st.rerun()
+                                campos = {"Tema": novo_tema, "Horas": nh + (nm/60) + (ns/3600), "Avaliação": nova_nota_c, "Nota_Lider": nova_nota_l}
+                                try:
+                                    atualizar_registro("Treinamentos", sel_id, campos, user_df.loc[sel_id, 'Versao'])
+                                    del st.session_state.editando_id; st.rerun()
+                                except ConflitoEdicao as e: st.error(str(e))
                         if st.button("Fechar"): del st.session_state.editando_id; st.rerun()
                         st.markdown('</div>', unsafe_allow_html=True)
 
             # --- HISTÓRICO ---
             st.divider(); st.subheader("📋 Detalhamento dos Registros")
             if not user_df.empty:
-                disp = user_df.copy()
-                def mask_nota(row):
-                    if row['Funcionário'] == st.session_state.usuario and not sou_adm: return "🔒 Privada"
-                    return row['Nota_Lider']
-                disp["Nota_Lider"] = disp.apply(mask_nota, axis=1)
-                disp["Horas"] = disp["Horas"].apply(format_to_time)
-                disp["Data"] = disp["Data"].dt.strftime('%d/%m/%Y')
-                st.dataframe(disp[["Data", "Funcionário", "Tema", "Horas", "Líder", "Avaliação", "Nota_Lider"]], use_container_width=True)
+                with desempenho.medir("tabela_registros"):
+                    disp = user_df.copy()
+                    nota_privada = (disp["Funcionário"] == st.session_state.usuario) & (not sou_adm)
+                    disp["Nota_Lider"] = notas_para_texto(disp["Nota_Lider"]).mask(nota_privada, "🔒 Privada")
+                    disp["Avaliação"] = notas_para_texto(disp["Avaliação"])
+                    disp["Horas"] = formatar_horas(disp["Horas"])
+                    disp["Data"] = disp["Data"].dt.strftime('%d/%m/%Y')
+                    st.dataframe(disp[["Data", "Funcionário", "Tema", "Horas", "Líder", "Avaliação", "Nota_Lider"]], use_container_width=True)
 
     # --- REGISTRO DE CURSO ---
     elif menu == "Registrar Curso":
@@ -331,51 +573,98 @@ else:
                     st.error("Preencha todos os campos obrigatórios.")
                 else:
                     total = h + (m/60) + (s/3600)
-                    nova = pd.DataFrame([{"Data": data.strftime("%d/%m/%Y"), "Funcionário": st.session_state.usuario, "Setor": st.session_state.setor_usuario, "Líder": lider, "Tema": tema, "Horas": total, "Avaliação": nota, "Nota_Lider": "-"}])
-                    df_full = pd.concat([carregar_dados(), nova], ignore_index=True)
-                    salvar_dados(df_full)
-                    st.success("Treinamento registrado com sucesso!"); st.rerun()
+                    nova = pd.DataFrame([{"ID": novo_id(), "Data": data.strftime("%d/%m/%Y"), "Funcionário": st.session_state.usuario, "Setor": st.session_state.setor_usuario, "Líder": lider, "Tema": tema, "Horas": total, "Avaliação": nota, "Nota_Lider": "-", "Versao": 1}])
+                    try:
+                        inserir_registros("Treinamentos", nova)
+                        st.success("Treinamento registrado com sucesso!"); st.rerun()
+                    except ArquivoSomenteLeitura as e: st.error(str(e))
 
     # --- RELATÓRIOS ---
     elif menu == "Relatório Geral":
         st.markdown('<h1 class="main-title-logged">RELATÓRIOS E DESEMPENHO</h1>', unsafe_allow_html=True)
-        df_rel = carregar_dados()
-        if not df_rel.empty:
+        # Só as partições do ano escolhido são consultadas; "Todos" junta a aba principal e os arquivos
+        anos_rel = sorted(set(anos_arquivados()) | set(df["Ano"][df["Ano"] > 0].unique().tolist()), reverse=True)
+        if anos_rel:
             # Filtros de Relatório por Perfil
-            if "Admin" in st.session_state.perfil or st.session_state.setor_usuario == "Diretoria":
-                cf1, cf2, cf3 = st.columns(3)
+            f_s = f_c = None
+            if ve_todos_setores():
+                cf1, cf2, cf3, cf4 = st.columns(4)
+                f_a = cf3.selectbox("Ano", ["Todos"] + anos_rel)
+                tabelas = tabelas_relatorio(None if f_a == "Todos" else [f_a])
                 f_s = cf1.selectbox("Setor", ["Todos"] + LISTA_SETORES[1:])
-                if f_s != "Todos": df_rel = df_rel[df_rel["Setor"] == f_s]
-                f_c = cf2.selectbox("Colaborador", ["Todos"] + sorted(df_rel["Funcionário"].unique().tolist()))
-                if f_c != "Todos": df_rel = df_rel[df_rel["Funcionário"] == f_c]
-                f_m = cf3.selectbox("Mês", ["Todos"] + LISTA_MESES)
+                f_s = None if f_s == "Todos" else f_s
+                f_c = cf2.selectbox("Colaborador", ["Todos"] + motor_relatorio.funcionarios(tabelas, setor=f_s))
+                f_m = cf4.selectbox("Mês", ["Todos"] + LISTA_MESES)
+                filtros_rel = ("Geral", f_s, f_c)
             elif "Gestor" in st.session_state.perfil:
-                cf1, cf2 = st.columns(2)
-                df_rel = df_rel[df_rel["Setor"] == st.session_state.setor_usuario]
-                f_c = cf1.selectbox("Colaborador", ["Todos"] + sorted(df_rel["Funcionário"].unique().tolist()))
-                if f_c != "Todos": df_rel = df_rel[df_rel["Funcionário"] == f_c]
-                f_m = cf2.selectbox("Mês", ["Todos"] + LISTA_MESES)
+                cf1, cf2, cf3 = st.columns(3)
+                f_a = cf2.selectbox("Ano", ["Todos"] + anos_rel)
+                tabelas = tabelas_relatorio(None if f_a == "Todos" else [f_a])
+                f_s = st.session_state.setor_usuario
+                f_c = cf1.selectbox("Colaborador", ["Todos"] + motor_relatorio.funcionarios(tabelas, setor=f_s))
+                f_m = cf3.selectbox("Mês", ["Todos"] + LISTA_MESES)
+                filtros_rel = ("Setor", f_s, f_c)
             else:
-                df_rel = df_rel[df_rel["Funcionário"] == st.session_state.usuario]
-                f_m = st.selectbox("Filtrar Mês", ["Todos"] + LISTA_MESES)
-
-            if f_m != "Todos": df_rel = df_rel[df_rel["Data"].dt.month == LISTA_MESES.index(f_m)+1]
+                cf1, cf2 = st.columns(2)
+                f_a = cf1.selectbox("Filtrar Ano", ["Todos"] + anos_rel)
+                tabelas = tabelas_relatorio(None if f_a == "Todos" else [f_a])
+                f_c = st.session_state.usuario
+                f_m = cf2.selectbox("Filtrar Mês", ["Todos"] + LISTA_MESES)
+                filtros_rel = ("Colaborador", f_c)
+            filtros_rel += (f_a, f_m)
+            # O mês é sempre o do ano escolhido; com "Todos" os anos, é o mesmo mês em cada ano
+            filtros = {"setor": f_s, "funcionario": None if f_c == "Todos" else f_c,
+                       "ano": None if f_a == "Todos" else f_a, "mes": None if f_m == "Todos" else LISTA_MESES.index(f_m)+1}
+
+            with desempenho.medir("filtros_relatorio"):
+                total_cursos, total_horas, media_n = motor_relatorio.totais(tabelas, **filtros)
 
             # Cards de Resumo
             st.divider()
             r1, r2, r3 = st.columns(3)
-            with r1: st.markdown(f'<div class="metric-card"><div class="metric-label">Total Cursos</div><div class="metric-value">{len(df_rel)}</div></div>', unsafe_allow_html=True)
-            with r2: st.markdown(f'<div class="metric-card"><div class="metric-label">Carga Horária</div><div class="metric-value">{format_to_time(df_rel["Horas"].sum())}</div></div>', unsafe_allow_html=True)
+            with r1: st.markdown(f'<div class="metric-card"><div class="metric-label">Total Cursos</div><div class="metric-value">{total_cursos}</div></div>', unsafe_allow_html=True)
+            with r2: st.markdown(f'<div class="metric-card"><div class="metric-label">Carga Horária</div><div class="metric-value">{format_to_time(total_horas)}</div></div>', unsafe_allow_html=True)
             with r3: 
-                media_n = pd.to_numeric(df_rel["Nota_Lider"], errors='coerce').mean()
                 st.markdown(f'<div class="metric-card"><div class="metric-label">Média Avaliação</div><div class="metric-value">{f"{media_n:.1f} ⭐" if not pd.isna(media_n) else "-"}</div></div>', unsafe_allow_html=True)
 
-            # Exportação
-            towrite = io.BytesIO()
-            df_export = df_rel.copy()
-            df_export['Data'] = df_export['Data'].dt.strftime('%d/%m/%Y')
-            df_export.to_excel(towrite, index=False, engine='openpyxl')
-            st.download_button("📥 BAIXAR EXCEL", towrite.getvalue(), f"Relatorio_Barbosa_{datetime.now().year}.xlsx", "application/vnd.ms-excel")
+            # Exportação: o arquivo só é gerado quando o botão é clicado, fora do rerun da página
+            colunas_exp = st.columns(len(FORMATOS))
+            for col_exp, (formato, (rotulo, mime)) in zip(colunas_exp, FORMATOS.items()):
+                col_exp.download_button(rotulo, lambda formato=formato: exportar_relatorio(tabelas, filtros_rel, formato, lambda: motor_relatorio.registros(tabelas, **filtros)),
+                                        f"Relatorio_Barbosa_{datetime.now().year}.{formato}", mime, on_click="ignore", key=f"exp_{formato}")
+
+            # --- TENDÊNCIAS ---
+            st.divider(); st.subheader("📈 Tendências")
+            with desempenho.medir("graficos_relatorio"):
+                # Comparação mês a mês: o ano escolhido contra o anterior, ou todos os anos
+                anos_tend = None if f_a == "Todos" else [f_a - 1, f_a]
+                tend = motor_relatorio.tendencia(tabelas_relatorio(anos_tend), **{**filtros, "ano": anos_tend, "mes": None})
+                tend = tend.assign(Mês=[LISTA_MESES[m-1] for m in tend["Mes"]], Ano=tend["Ano"].astype(str))
+                fig_tend = px.line(tend, x="Mês", y="Horas", color="Ano", markers=True, template="plotly_dark",
+                                   category_orders={"Mês": LISTA_MESES}, title="Horas por Mês")
+                st.plotly_chart(fig_tend, use_container_width=True)
+
+                tg1, tg2 = st.columns(2)
+                with tg1:
+                    setor_mes = motor_relatorio.horas_setor_mes(tabelas, **filtros)
+                    setor_mes["Período"] = setor_mes["Mes"].map("{:02d}".format) + "/" + setor_mes["Ano"].astype(str)
+                    fig_setor = px.bar(setor_mes, x="Período", y="Horas", color="Setor", template="plotly_dark",
+                                       title="Horas por Setor e Mês")
+                    st.plotly_chart(fig_setor, use_container_width=True)
+                with tg2:
+                    temas = motor_relatorio.top_temas(tabelas, 10, **filtros)
+                    fig_temas = px.bar(temas, x="Horas", y="Tema", orientation="h", template="plotly_dark",
+                                       hover_data=["Cursos"], title="Temas com Mais Horas")
+                    fig_temas.update_yaxes(autorange="reversed")
+                    st.plotly_chart(fig_temas, use_container_width=True)
+
+                # A nota do líder é privada para o próprio colaborador
+                if tem_perfil("Gestor", "Admin"):
+                    notas = motor_relatorio.distribuicao_notas_lider(tabelas, **filtros)
+                    fig_notas = px.bar(notas, x="Nota", y="Registros", template="plotly_dark",
+                                       title="Distribuição das Notas do Líder")
+                    fig_notas.update_xaxes(dtick=1)
+                    st.plotly_chart(fig_notas, use_container_width=True)
 
     # --- ADMINISTRAÇÃO ---
     elif menu == "Painel Administrativo":
@@ -383,46 +672,79 @@ else:
         udf = carregar_usuarios()
         
         # Alertas de Inatividade
-        st.subheader("⚠️ Alertas de Inatividade (> 15 dias)")
-        df_inat = carregar_dados()
-        if not df_inat.empty:
-            hoje = datetime.now()
-            ult_reg = df_inat.groupby("Funcionário")["Data"].max().reset_index()
-            alertas = []
-            for _, u in udf.iterrows():
-                reg = ult_reg[ult_reg["Funcionário"] == u['usuario']]
-                if reg.empty: alertas.append(f"🔴 {u['usuario']}: Nunca registrou treinamento.")
-                else:
-                    dias = (hoje - reg.iloc[0]['Data']).days
-                    if dias > 15: alertas.append(f"🟠 {u['usuario']}: Inativo há {dias} dias.")
-            
-            if alertas:
-                for a in alertas: st.markdown(f'<div class="inactive-alert">{a}</div>', unsafe_allow_html=True)
+        limite_inat = st.sidebar.number_input("Alerta de inatividade (dias)", 1, 365, LIMITE_INATIVIDADE)
+        st.subheader(f"⚠️ Alertas de Inatividade (> {limite_inat} dias)")
+        if not df.empty or anos_arquivados():
+            ultimos = carregar_ultimos_registros(udf["usuario"])
+            with desempenho.medir("alertas_inatividade"):
+                alertas = alertas_inatividade(udf, ultimos, pd.Timestamp(datetime.now()), limite_inat)
+            if not alertas.empty:
+                st.dataframe(alertas, hide_index=True, use_container_width=True,
+                             column_config={"Último Registro": st.column_config.DateColumn(format="DD/MM/YYYY")})
             else: st.success("Todos os colaboradores estão ativos!")
 
-        t1, t2, t3 = st.tabs(["Lista de Usuários", "Criar Novo", "Editar Perfil"])
-        with t1: st.dataframe(udf, use_container_width=True)
+        t1, t2, t3, t4, t5 = st.tabs(["Lista de Usuários", "Criar Novo", "Editar Perfil", "Desempenho", "Importar Treinamentos"])
+        with t1: st.dataframe(udf.drop(columns=["senha"], errors="ignore"), use_container_width=True)
         with t2:
             with st.form("new_user"):
                 nu, ns = st.text_input("Nome Completo"), st.text_input("Senha", type="password")
                 nset = st.selectbox("Setor", LISTA_SETORES[1:])
-                np = st.multiselect("Perfis", ["Comum", "Gestor", "Editor", "Admin"], default=["Comum"])
+                np = st.multiselect("Perfis", LISTA_PERFIS, default=["Comum"])
                 if st.form_submit_button("CADASTRAR"):
-                    if nu and ns:
-                        new_u = pd.DataFrame([{"usuario": nu, "senha": ns, "perfil": str(np), "setor": nset}])
-                        salvar_usuarios(pd.concat([udf, new_u], ignore_index=True))
+                    if nu in carregar_diretorio(): st.error("Já existe um usuário com esse nome.")
+                    elif nu and ns:
+                        new_u = pd.DataFrame([{"ID": novo_id(), "usuario": nu, "senha": gerar_hash(ns), "perfil": str(np), "setor": nset, "Versao": 1}])
+                        inserir_registros("Usuarios", new_u)
                         st.success("Usuário cadastrado!"); st.rerun()
         with t3:
-            u_sel = st.selectbox("Selecionar Usuário", udf['usuario'].tolist())
-            d = udf[udf['usuario'] == u_sel].iloc[0]
+            diretorio = carregar_diretorio()
+            u_sel = st.selectbox("Selecionar Usuário", diretorio.nomes())
+            d = diretorio.get(u_sel)
             with st.form("edit_user"):
-                es = st.text_input("Senha", value=str(d['senha']))
-                eset = st.selectbox("Setor", LISTA_SETORES[1:], index=LISTA_SETORES[1:].index(d['setor']) if d['setor'] in LISTA_SETORES else 0)
-                ep = st.multiselect("Perfis", ["Comum", "Gestor", "Editor", "Admin"], default=converter_perfil(d['perfil']))
+                # Só o hash é guardado: a senha atual não pode ser exibida, apenas trocada
+                es = st.text_input("Nova Senha (em branco mantém a atual)", type="password")
+                eset = st.selectbox("Setor", LISTA_SETORES[1:], index=LISTA_SETORES[1:].index(d.setor) if d.setor in LISTA_SETORES[1:] else 0)
+                ep = st.multiselect("Perfis", LISTA_PERFIS, default=[p for p in LISTA_PERFIS if p in d.perfis])
                 if st.form_submit_button("ATUALIZAR"):
-                    udf.loc[udf['usuario'] == u_sel, ["senha", "perfil", "setor"]] = [es, str(ep), eset]
-                    salvar_usuarios(udf); st.success("Dados atualizados!"); st.rerun()
+                    campos = {"perfil": str(ep), "setor": eset}
+                    if es: campos["senha"] = gerar_hash(es)
+                    try:
+                        atualizar_registro("Usuarios", d.id, campos, d.versao)
+                        st.success("Dados atualizados!"); st.rerun()
+                    except ConflitoEdicao as e: st.error(str(e))
+        with t4:
+            medicoes = desempenho.entradas()
+            st.caption(f"Últimas {len(medicoes)} medições deste processo (máximo {desempenho.capacidade}), em milissegundos. "
+                       f"Gravações na fila: {backend.pendentes()}.")
+            st.dataframe(percentis(medicoes), hide_index=True, use_container_width=True)
+            if st.button("Limpar medições"): desempenho.limpar(); st.rerun()
+        with t5:
+            st.caption(f"CSV ou Excel com as colunas {', '.join(COLUNAS_IMPORTACAO)}. Data em DD/MM/AAAA, Horas em H:M:S "
+                       "e Avaliação de 1 a 10; o Setor vem do cadastro do colaborador.")
+            arq_imp = st.file_uploader("Arquivo de treinamentos", type=["csv", "xlsx"])
+            id_imp = (arq_imp.name, arq_imp.size) if arq_imp is not None else None
+            if arq_imp is not None and st.button("VALIDAR ARQUIVO"):
+                try:
+                    with desempenho.medir("validar_importacao"):
+                        st.session_state.importacao = (id_imp, validar_importacao(arq_imp, arq_imp.name, carregar_diretorio(),
+                                                                                  chaves_existentes(), anos_arquivados()))
+                except ValueError as e: st.error(str(e))
+            validado, resultado = st.session_state.get("importacao", (None, None))
+            if resultado is not None and validado == id_imp:
+                st.info(f"{resultado.linhas} linhas lidas: {len(resultado.registros)} válidas e {len(resultado.erros)} com erro.")
+                if not resultado.erros.empty:
+                    st.dataframe(resultado.erros, hide_index=True, use_container_width=True)
+                    st.download_button("📄 BAIXAR RELATÓRIO DE ERROS", relatorio_erros(resultado), "erros_importacao.csv", "text/csv")
+                if len(resultado.registros) and st.button(f"IMPORTAR {len(resultado.registros)} REGISTROS"):
+                    barra = st.progress(0.0, "Gravando...")
+                    try:
+                        importar_registros(resultado, barra.progress)
+                        del st.session_state.importacao
+                        st.success(f"{len(resultado.registros)} treinamentos importados!")
+                    except ArquivoSomenteLeitura as e: st.error(str(e))
 
     if st.sidebar.button("SAIR"):
         st.session_state.autenticado = False
         st.rerun()
+
+desempenho.encerrar(st.session_state.pop("_rerun_desempenho", None))
@@ -0,0 +1,447 @@
+import glob
+import os
+import sqlite3
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+from gspread.utils import rowcol_to_a1
+from pandas.io.parsers import TextParser
+
+COL_ID = "ID"
+COL_VERSAO = "Versao"
+COLUNAS_DATA = ["Data"]
+CAMINHO_SQLITE_PADRAO = os.path.join("dados", "treinamentos.db")
+# Acima disso a sincronização parcial da planilha desiste e lê a aba inteira
+MAX_LINHAS_DELTA = 200
+
+# Tipos das colunas no banco local; as demais são TEXT, mesmo quando a planilha devolve só
+# números (senhas como 123456 virariam REAL e voltariam como "123456.0")
+TIPOS_SQL = {COL_ID: "TEXT PRIMARY KEY", COL_VERSAO: "INTEGER", "Horas": "REAL"}
+
+# Colunas indexadas no banco local, por aba
+INDICES_LOCAIS = {
+    "Treinamentos": ["Funcionário", "Setor", "Data"],
+    "Usuarios": ["usuario"],
+}
+
+
+class ConflitoEdicao(Exception):
+    """O registro foi alterado ou removido por outra sessão desde a leitura."""
+
+
+class ArquivoSomenteLeitura(ConflitoEdicao):
+    """O registro é de um ano já arquivado, que não aceita mais alterações."""
+
+
+def nome_arquivo(aba, ano):
+    return f"{aba}_{ano}"
+
+
+def novo_id():
+    # Prefixo em letra: um hex só de dígitos e "e" seria lido pela planilha como número
+    return "R" + uuid.uuid4().hex[:15]
+
+
+def garantir_ids(df):
+    """Preenche ID e Versao das linhas que ainda não têm. Retorna (df, alterado)."""
+    df = df.copy()
+    alterado = False
+    if COL_ID not in df.columns:
+        df.insert(0, COL_ID, None)
+        alterado = True
+    ids = df[COL_ID].astype(object)
+    vazios = ids.isna() | (ids.astype(str).str.strip() == "") | ids.duplicated()
+    if vazios.any():
+        ids[vazios] = [novo_id() for _ in range(int(vazios.sum()))]
+        alterado = True
+    df[COL_ID] = ids.astype(str)
+
+    if COL_VERSAO not in df.columns:
+        df[COL_VERSAO] = 1
+        alterado = True
+    versoes = pd.to_numeric(df[COL_VERSAO], errors="coerce")
+    if versoes.isna().any():
+        alterado = True
+    df[COL_VERSAO] = versoes.fillna(1).astype(int)
+    return df, alterado
+
+
+def _celula(valor):
+    if valor is None or (pd.api.types.is_scalar(valor) and pd.isna(valor)):
+        return ""
+    if isinstance(valor, datetime):
+        return valor.strftime("%d/%m/%Y")
+    if hasattr(valor, "item"):
+        return valor.item()
+    return valor
+
+
+def _celula_sql(valor, coluna=None):
+    valor = _celula(valor)
+    if valor == "":
+        return None
+    # Em coluna de texto, 123456.0 (inteiro lido como float por causa de vazios) é gravado como "123456"
+    if coluna not in TIPOS_SQL and isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return valor
+
+
+def _datas(serie):
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie
+    # Mesma leitura usada em normalizar_treinamentos, para o banco local guardar o que o app enxerga
+    return pd.to_datetime(serie, dayfirst=True, errors="coerce")
+
+
+def _serializar_datas(df):
+    """Converte colunas de data para o texto DD/MM/AAAA usado na planilha."""
+    df = df.copy()
+    for col in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = df[col].dt.strftime("%d/%m/%Y")
+    return df
+
+
+def _versao(valor):
+    try:
+        return int(float(str(valor).replace(",", ".")))
+    except ValueError:
+        return 0
+
+
+def _diferencas(atuais, conhecidas):
+    """IDs novos ou com outra Versao em ``atuais`` e IDs de ``conhecidas`` que sumiram.
+
+    Ambos são Series ID -> Versao. None se houver ID vazio ou repetido: aí só
+    a leitura completa (que completa os IDs) resolve.
+    """
+    if atuais.index.hasnans or (atuais.index == "").any() or atuais.index.duplicated().any():
+        return None
+    removidos = conhecidas.index.difference(atuais.index).tolist()
+    anteriores = conhecidas.astype(int).reindex(atuais.index)
+    alterados = atuais.index[anteriores.isna() | (anteriores != atuais)].tolist()
+    return alterados, removidos
+
+
+class BackendGSheets:
+    """Leitura e gravação das abas pela conexão do st-gsheets-connection.
+
+    Além da leitura/escrita da aba inteira, oferece operações por linha
+    (``append_rows``, ``update_row``, ``delete_row``) que localizam o registro
+    pela coluna ID e conferem a coluna Versao antes de gravar. ``incremento``
+    permite aplicar várias edições já somadas como uma só.
+
+    ``ler_alteracoes`` compara as colunas ID e Versao com as de um snapshot e
+    busca só as linhas novas ou alteradas. Como toda gravação do app incrementa
+    a Versao, isso basta; edições feitas à mão na planilha só aparecem na
+    próxima leitura completa.
+
+    Anos encerrados podem ser arquivados (``arquivar_ano``) em abas próprias,
+    "Treinamentos_2023" etc., lidas só quando algum filtro pede aquele ano.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self._cabecalhos = {}
+
+    def ler(self, aba):
+        return self.conn.read(worksheet=aba, ttl=0)
+
+    def escrever(self, aba, df):
+        self.conn.update(worksheet=aba, data=_serializar_datas(df))
+        self._cabecalhos.pop(aba, None)
+
+    def _aba(self, aba):
+        return self.conn.client._select_worksheet(worksheet=aba)
+
+    def anos_arquivados(self, aba):
+        prefixo = nome_arquivo(aba, "")
+        titulos = [ws.title for ws in self.conn.client._open_spreadsheet().worksheets()]
+        return sorted(int(t[len(prefixo):]) for t in titulos if t.startswith(prefixo) and t[len(prefixo):].isdigit())
+
+    def ler_arquivo(self, aba, ano):
+        return self.conn.read(worksheet=nome_arquivo(aba, ano), ttl=0)
+
+    def gravar_arquivo(self, aba, ano, df):
+        if ano in self.anos_arquivados(aba):
+            self.conn.update(worksheet=nome_arquivo(aba, ano), data=_serializar_datas(df))
+        else:
+            self.conn.create(worksheet=nome_arquivo(aba, ano), data=_serializar_datas(df))
+
+    def ler_alteracoes(self, aba, versoes):
+        """(linhas novas ou alteradas, IDs removidos) em relação a ``versoes`` (Series ID -> Versao).
+
+        None quando é preciso ler a aba inteira.
+        """
+        ws = self._aba(aba)
+        cabecalho, colunas = self._ler_colunas(ws, aba, [COL_ID, COL_VERSAO])
+        if colunas is None:
+            return None
+        ids, versoes_planilha = colunas
+        total = max(len(ids), len(versoes_planilha))
+        ids = [str(linha[0]) if linha else "" for linha in ids] + [""] * (total - len(ids))
+        versoes_planilha = [_versao(linha[0]) if linha else 0 for linha in versoes_planilha] + [0] * (total - len(versoes_planilha))
+
+        diferencas = _diferencas(pd.Series(versoes_planilha, index=ids, dtype=int), versoes)
+        if diferencas is None or len(diferencas[0]) > MAX_LINHAS_DELTA:
+            return None
+        alterados, removidos = diferencas
+        posicoes = {id_registro: i + 2 for i, id_registro in enumerate(ids)}
+        ultima = rowcol_to_a1(1, len(cabecalho))[:-1]
+        blocos = ws.batch_get([f"A{posicoes[i]}:{ultima}{posicoes[i]}" for i in alterados]) if alterados else []
+        linhas = [bloco[0] if bloco else [] for bloco in blocos]
+        # Mesmo parser que o get_as_dataframe usa na leitura completa
+        df = TextParser([cabecalho] + [linha + [""] * (len(cabecalho) - len(linha)) for linha in linhas]).read()
+        return df, removidos
+
+    # O cabeçalho é relido a cada gravação: colunas inseridas ou reordenadas à mão na planilha
+    # deslocariam os valores se a posição em cache fosse usada
+    def _cabecalho(self, ws, aba):
+        self._cabecalhos[aba] = ws.row_values(1)
+        return self._cabecalhos[aba]
+
+    def _ler_colunas(self, ws, aba, colunas):
+        """Cabeçalho atual e os valores de ``colunas`` (da linha 2 em diante) numa só leitura.
+
+        As posições vêm do cabeçalho em cache e a linha 1 é lida junto; se ela
+        mudou, as colunas são lidas de novo nas posições certas. Os valores são
+        None quando alguma das colunas não existe.
+        """
+        cabecalho = self._cabecalhos.get(aba) or self._cabecalho(ws, aba)
+        while True:
+            if any(c not in cabecalho for c in colunas):
+                return cabecalho, None
+            letras = [rowcol_to_a1(1, cabecalho.index(c) + 1)[:-1] for c in colunas]
+            primeira, *valores = ws.batch_get(["1:1"] + [f"{letra}2:{letra}" for letra in letras])
+            atual = self._cabecalhos[aba] = list(primeira[0]) if primeira else []
+            if atual == list(cabecalho):
+                return atual, valores
+            cabecalho = atual
+
+    def _localizar(self, ws, aba, id_registro, versao_esperada):
+        cabecalho, colunas = self._ler_colunas(ws, aba, [COL_ID, COL_VERSAO])
+        if colunas is None:
+            raise ValueError(f"A aba {aba} não tem as colunas {COL_ID} e {COL_VERSAO}.")
+        ids, versoes = ([str(linha[0]) if linha else "" for linha in coluna] for coluna in colunas)
+        try:
+            posicao = ids.index(str(id_registro))
+        except ValueError:
+            raise ConflitoEdicao("O registro foi excluído por outro usuário.")
+        versao_atual = _versao(versoes[posicao]) if posicao < len(versoes) else 0
+        if versao_esperada is not None and versao_atual != int(versao_esperada):
+            raise ConflitoEdicao("O registro foi alterado por outro usuário. Recarregue e tente novamente.")
+        return cabecalho, posicao + 2, versao_atual
+
+    def append_rows(self, aba, df):
+        ws = self._aba(aba)
+        cabecalho = self._cabecalho(ws, aba)
+        if not cabecalho:
+            cabecalho = self._cabecalhos[aba] = list(df.columns)
+            ws.append_row(cabecalho)
+        linhas = [[_celula(v) for v in linha] for linha in df.reindex(columns=cabecalho).itertuples(index=False)]
+        ws.append_rows(linhas, value_input_option="USER_ENTERED")
+
+    def update_row(self, aba, id_registro, campos, versao_esperada=None, incremento=1):
+        ws = self._aba(aba)
+        cabecalho, linha, versao_atual = self._localizar(ws, aba, id_registro, versao_esperada)
+        campos = dict(campos, **{COL_VERSAO: versao_atual + incremento})
+        ws.batch_update(
+            [{"range": rowcol_to_a1(linha, cabecalho.index(c) + 1), "values": [[_celula(v)]]} for c, v in campos.items()],
+            value_input_option="USER_ENTERED",
+        )
+
+    def delete_row(self, aba, id_registro, versao_esperada=None):
+        ws = self._aba(aba)
+        _, linha, _ = self._localizar(ws, aba, id_registro, versao_esperada)
+        ws.delete_rows(linha)
+
+
+class BackendSQLite:
+    """Banco SQLite local com a mesma interface de ``BackendGSheets``.
+
+    Cada aba vira uma tabela com ID como chave primária e índices em
+    ``INDICES_LOCAIS``. Datas são gravadas em ISO (AAAA-MM-DD) e devolvidas
+    como DD/MM/AAAA, igual à planilha. Anos arquivados viram arquivos Parquet
+    em ``arquivo/``, ao lado do banco, no mesmo formato devolvido por ``ler``.
+    """
+
+    def __init__(self, caminho=CAMINHO_SQLITE_PADRAO):
+        self.caminho = caminho
+        pasta = os.path.dirname(caminho)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        self.pasta_arquivo = os.path.join(pasta, "arquivo")
+        with self._conectar() as con:
+            con.execute("PRAGMA journal_mode=WAL")
+
+    @contextmanager
+    def _conectar(self):
+        con = sqlite3.connect(self.caminho, timeout=30)
+        try:
+            with con:
+                yield con
+        finally:
+            con.close()
+
+    def _colunas(self, con, aba):
+        return [linha[1] for linha in con.execute(f'PRAGMA table_info("{aba}")')]
+
+    def _para_sql(self, df):
+        df = df.copy()
+        for col in COLUNAS_DATA:
+            if col in df.columns:
+                df[col] = _datas(df[col]).dt.strftime("%Y-%m-%d")
+        colunas = list(df.columns)
+        return [tuple(_celula_sql(v, c) for c, v in zip(colunas, linha)) for linha in df.itertuples(index=False)]
+
+    def _valor_sql(self, coluna, valor):
+        if coluna in COLUNAS_DATA:
+            return self._para_sql(pd.DataFrame({coluna: [valor]}))[0][0]
+        return _celula_sql(valor, coluna)
+
+    def _de_sql(self, df):
+        for col in COLUNAS_DATA:
+            if col in df.columns:
+                df[col] = pd.to_datetime(df[col], format="%Y-%m-%d", errors="coerce").dt.strftime("%d/%m/%Y")
+        return df
+
+    def ler(self, aba):
+        with self._conectar() as con:
+            if not self._colunas(con, aba):
+                return pd.DataFrame()
+            df = pd.read_sql_query(f'SELECT * FROM "{aba}"', con)
+        return self._de_sql(df)
+
+    def _caminho_arquivo(self, aba, ano):
+        return os.path.join(self.pasta_arquivo, nome_arquivo(aba, ano) + ".parquet")
+
+    def anos_arquivados(self, aba):
+        prefixo = nome_arquivo(aba, "")
+        nomes = (os.path.basename(c)[len(prefixo):-len(".parquet")] for c in glob.glob(self._caminho_arquivo(aba, "*")))
+        return sorted(int(n) for n in nomes if n.isdigit())
+
+    def ler_arquivo(self, aba, ano):
+        return pd.read_parquet(self._caminho_arquivo(aba, ano))
+
+    def gravar_arquivo(self, aba, ano, df):
+        os.makedirs(self.pasta_arquivo, exist_ok=True)
+        df = df.copy()
+        # Colunas mistas (notas "7.0" e "-") não cabem num tipo do Parquet: vão como texto
+        for col in df.columns:
+            if df[col].dtype == object:
+                df[col] = df[col].astype("string")
+        caminho = self._caminho_arquivo(aba, ano)
+        df.to_parquet(caminho + ".tmp", index=False)
+        os.replace(caminho + ".tmp", caminho)
+
+    def ler_alteracoes(self, aba, versoes):
+        with self._conectar() as con:
+            colunas = self._colunas(con, aba)
+            if COL_ID not in colunas or COL_VERSAO not in colunas:
+                return None
+            atuais = con.execute(f'SELECT "{COL_ID}", "{COL_VERSAO}" FROM "{aba}"').fetchall()
+            diferencas = _diferencas(pd.Series([_versao(v) for _, v in atuais], index=[i for i, _ in atuais], dtype=int), versoes)
+            if diferencas is None:
+                return None
+            alterados, removidos = diferencas
+            partes = []
+            for inicio in range(0, len(alterados), 500):
+                bloco = alterados[inicio:inicio + 500]
+                partes.append(pd.read_sql_query(f'SELECT * FROM "{aba}" WHERE "{COL_ID}" IN ({", ".join("?" * len(bloco))})', con, params=bloco))
+        df = pd.concat(partes, ignore_index=True) if partes else pd.DataFrame(columns=colunas)
+        return self._de_sql(df), removidos
+
+    def escrever(self, aba, df):
+        definicoes = [f'"{col}" {TIPOS_SQL.get(col, "TEXT")}' for col in df.columns]
+        marcadores = ", ".join("?" * len(df.columns))
+        with self._conectar() as con:
+            con.execute(f'DROP TABLE IF EXISTS "{aba}"')
+            con.execute(f'CREATE TABLE "{aba}" ({", ".join(definicoes)})')
+            con.executemany(f'INSERT INTO "{aba}" VALUES ({marcadores})', self._para_sql(df))
+            for col in INDICES_LOCAIS.get(aba, []):
+                if col in df.columns:
+                    con.execute(f'CREATE INDEX "ix_{aba}_{col}" ON "{aba}" ("{col}")')
+
+    def append_rows(self, aba, df):
+        with self._conectar() as con:
+            colunas = self._colunas(con, aba)
+        if not colunas:
+            self.escrever(aba, df)
+            return
+        df = df[[c for c in df.columns if c in colunas]]
+        nomes = ", ".join(f'"{c}"' for c in df.columns)
+        marcadores = ", ".join("?" * len(df.columns))
+        with self._conectar() as con:
+            con.executemany(f'INSERT INTO "{aba}" ({nomes}) VALUES ({marcadores})', self._para_sql(df))
+
+    def _conferir(self, con, aba, cursor, id_registro):
+        # Nenhuma linha afetada: ou o registro sumiu, ou a Versao não confere
+        if cursor.rowcount == 0:
+            existe = con.execute(f'SELECT 1 FROM "{aba}" WHERE "{COL_ID}" = ?', (str(id_registro),)).fetchone()
+            if existe is None:
+                raise ConflitoEdicao("O registro foi excluído por outro usuário.")
+            raise ConflitoEdicao("O registro foi alterado por outro usuário. Recarregue e tente novamente.")
+
+    def _filtro(self, id_registro, versao_esperada):
+        sql, params = f' WHERE "{COL_ID}" = ?', [str(id_registro)]
+        if versao_esperada is not None:
+            sql += f' AND "{COL_VERSAO}" = ?'
+            params.append(int(versao_esperada))
+        return sql, params
+
+    def update_row(self, aba, id_registro, campos, versao_esperada=None, incremento=1):
+        atribuicoes = [f'"{c}" = ?' for c in campos] + [f'"{COL_VERSAO}" = "{COL_VERSAO}" + ?']
+        valores = [self._valor_sql(c, v) for c, v in campos.items()] + [int(incremento)]
+        filtro, params = self._filtro(id_registro, versao_esperada)
+        with self._conectar() as con:
+            cursor = con.execute(f'UPDATE "{aba}" SET {", ".join(atribuicoes)}{filtro}', valores + params)
+            self._conferir(con, aba, cursor, id_registro)
+
+    def delete_row(self, aba, id_registro, versao_esperada=None):
+        filtro, params = self._filtro(id_registro, versao_esperada)
+        with self._conectar() as con:
+            cursor = con.execute(f'DELETE FROM "{aba}"{filtro}', params)
+            self._conferir(con, aba, cursor, id_registro)
+
+
+def anos_dos_registros(df):
+    return _datas(df["Data"]).dt.year
+
+
+def arquivar_ano(backend, aba, ano, hoje=None):
+    """Move os registros de ``ano`` da aba para o arquivo daquele ano. Retorna quantos.
+
+    Só anos encerrados podem ser arquivados. O arquivo é gravado antes de a
+    aba ser reescrita; se o processo cair no meio, os leitores já ignoram na
+    aba os anos que têm arquivo.
+    """
+    if ano >= (hoje or datetime.now()).year:
+        raise ValueError(f"{ano} ainda não terminou e não pode ser arquivado.")
+    df = backend.ler(aba)
+    do_ano = (anos_dos_registros(df) == ano).to_numpy()
+    arquivo = df[do_ano]
+    if ano in backend.anos_arquivados(aba):
+        arquivo = pd.concat([backend.ler_arquivo(aba, ano), arquivo], ignore_index=True)
+        arquivo = arquivo.drop_duplicates(COL_ID, keep="last")
+    if do_ano.any():
+        backend.gravar_arquivo(aba, ano, arquivo)
+        backend.escrever(aba, df[~do_ano])
+    return int(do_ano.sum())
+
+
+def _conectar_gsheets():
+    import streamlit as st
+    from streamlit_gsheets import GSheetsConnection
+    return st.connection("gsheets", type=GSheetsConnection)
+
+
+def criar_backend(tipo=None, conectar_gsheets=_conectar_gsheets):
+    """Backend escolhido pela variável ARMAZENAMENTO ("gsheets" ou "sqlite")."""
+    tipo = tipo or os.environ.get("ARMAZENAMENTO", "gsheets")
+    if tipo == "sqlite":
+        return BackendSQLite(os.environ.get("ARMAZENAMENTO_SQLITE", CAMINHO_SQLITE_PADRAO))
+    if tipo == "gsheets":
+        return BackendGSheets(conectar_gsheets())
+    raise ValueError(f"Backend de armazenamento desconhecido: {tipo}")
@@ -0,0 +1,5 @@
+"""Benchmark dos caminhos de dados do app, fora do Streamlit.
+
+Uso:
+    python -m bench.benchmark --escalas pequena media --json resultados.json
+"""
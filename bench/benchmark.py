@@ -0,0 +1,206 @@
+"""Latência e pico de memória dos caminhos de dados do app por escala de dados.
+
+Uso:
+    python -m bench.benchmark [--escalas pequena media grande] [--repeticoes 5]
+                              [--operacoes login dashboard ...] [--json arquivo]
+
+A latência é a mediana de ``--repeticoes`` execuções; o pico de memória vem
+de uma execução separada sob tracemalloc (que deixa tudo mais lento).
+"""
+import argparse
+import io
+import itertools
+import json
+import statistics
+import sys
+import time
+import tracemalloc
+
+import pandas as pd
+
+from agregados import alertas_inatividade, construir_resumo, filtrar_resumo, ultimo_registro
+from analitico import MotorRelatorio
+from armazenamento import BackendGSheets
+from bench.conexao_local import ConexaoLocal
+from bench.gerador import ESCALAS, gerar_abas
+from consultas import (filtrar_relatorio, funcionarios_no_resumo, horas_dashboard, ler_treinamentos, ler_usuarios,
+                       metas_por_colaborador, registros_dashboard, totais_relatorio)
+from esquema import indexar_periodos, registros_do_periodo
+from exportacao import gerar_exportacao
+from formatacao import formatar_horas, notas_para_texto
+from importacao import chaves_registros, validar_importacao
+from usuarios import Diretorio, gerar_hash
+
+
+class Contexto:
+    """Dados de uma escala já carregados, como estariam no cache do app."""
+
+    def __init__(self, escala, semente=0):
+        self.abas = gerar_abas(escala, semente)
+        self.backend = BackendGSheets(ConexaoLocal(self.abas))
+        self.df = ler_treinamentos(self.backend)
+        self.usuarios = ler_usuarios(self.backend)
+        self.resumo = construir_resumo(self.df)
+        self.indice = indexar_periodos(self.df)
+        self.ultimos = ultimo_registro(self.df)
+        self.hoje = self.df["Data"].max() + pd.Timedelta(days=20)
+        self.ano, self.mes = self.hoje.year, self.hoje.month - 1 or 12
+        self.setor = self.usuarios["setor"].iloc[0]
+        self.usuario = self.usuarios.iloc[-1]
+        # Só o usuário do login precisa da senha em hash (que é cara de gerar para milhares)
+        self.senha = self.usuario["senha"]
+        self.usuarios.loc[self.usuarios.index[-1], "senha"] = gerar_hash(self.senha)
+        self.diretorio = Diretorio(self.usuarios)
+        self.motor = MotorRelatorio()
+        self.versoes = itertools.count(2)
+        self.tabelas = [self.motor.sincronizar("principal", 1, self.df)]
+        self.chaves = frozenset(chaves_registros(self.df))
+        self.importacao = _arquivo_importacao(self.df)
+
+
+# Até 50 mil registros já existentes, um dia depois, no formato do arquivo de importação
+def _arquivo_importacao(df, linhas=50000):
+    amostra = df[df["Ano"] > 0].tail(linhas)
+    arquivo = pd.DataFrame({
+        "Data": (amostra["Data"] + pd.Timedelta(days=1)).dt.strftime("%d/%m/%Y"),
+        "Funcionário": amostra["Funcionário"], "Líder": amostra["Líder"], "Tema": amostra["Tema"],
+        "Horas": formatar_horas(amostra["Horas"]).to_numpy(), "Avaliação": notas_para_texto(amostra["Avaliação"]),
+    })
+    return arquivo.to_csv(index=False, sep=";").encode("utf-8")
+
+
+# --- OPERAÇÕES ---
+def _login(ctx):
+    return ctx.diretorio.autenticar(ctx.usuario["usuario"], ctx.senha)
+
+
+def _dashboard(ctx):
+    # Visão de gestor: todos os colaboradores do setor no mês
+    resumo_mes = filtrar_resumo(ctx.resumo, ano=ctx.ano, mes=ctx.mes)
+    colaboradores = funcionarios_no_resumo(ctx.resumo, ctx.setor)
+    user_df = registros_dashboard(registros_do_periodo(ctx.df, ctx.indice, ctx.ano, ctx.mes), colaboradores)
+    horas = horas_dashboard(resumo_mes, colaboradores)
+    metas = metas_por_colaborador(resumo_mes, ctx.usuarios["usuario"].unique())
+    return user_df, horas, metas
+
+
+def _relatorio(ctx):
+    df_rel, resumo_rel = filtrar_relatorio(ctx.df, ctx.resumo, setor=ctx.setor)
+    return df_rel, totais_relatorio(resumo_rel)
+
+
+def _relatorio_mes(ctx):
+    _, resumo_rel = filtrar_relatorio(ctx.df, ctx.resumo, setor=ctx.setor, ano=ctx.ano, mes=ctx.mes)
+    return totais_relatorio(resumo_rel)
+
+
+# O que a página calcula a cada rerun; os registros só são consultados na exportação
+def _relatorio_duckdb(ctx):
+    return ctx.motor.funcionarios(ctx.tabelas, setor=ctx.setor), ctx.motor.totais(ctx.tabelas, setor=ctx.setor)
+
+
+def _relatorio_mes_duckdb(ctx):
+    return ctx.motor.totais(ctx.tabelas, setor=ctx.setor, ano=ctx.ano, mes=ctx.mes)
+
+
+# Os mesmos agrupamentos dos gráficos do Relatório Geral, em pandas e no DuckDB
+def _rollups_pandas(ctx):
+    df = ctx.df[ctx.df["Setor"] == ctx.setor]
+    com_data = df[df["Ano"] > 0]
+    return (com_data.groupby(["Ano", "Mes", "Setor"], observed=True)["Horas"].sum(),
+            df["Nota_Lider"].value_counts().sort_index(),
+            df.groupby("Tema", observed=True)["Horas"].agg(["sum", "count"]).nlargest(10, "sum"),
+            com_data.groupby(["Ano", "Mes"])["Horas"].agg(["sum", "count"]))
+
+
+def _rollups_duckdb(ctx):
+    return (ctx.motor.horas_setor_mes(ctx.tabelas, setor=ctx.setor),
+            ctx.motor.distribuicao_notas_lider(ctx.tabelas, setor=ctx.setor),
+            ctx.motor.top_temas(ctx.tabelas, 10, setor=ctx.setor),
+            ctx.motor.tendencia(ctx.tabelas, setor=ctx.setor))
+
+
+def _exportar(formato):
+    def exportar(ctx):
+        df_rel, _ = filtrar_relatorio(ctx.df, ctx.resumo, setor=ctx.setor)
+        return gerar_exportacao(df_rel, formato)
+    return exportar
+
+
+def _importar_csv(ctx):
+    return validar_importacao(io.BytesIO(ctx.importacao), "importacao.csv", ctx.diretorio, ctx.chaves)
+
+
+OPERACOES = {
+    "carregar_dados": lambda ctx: ler_treinamentos(ctx.backend),
+    "carregar_usuarios": lambda ctx: ler_usuarios(ctx.backend),
+    "diretorio": lambda ctx: Diretorio(ctx.usuarios),
+    "login": _login,
+    "resumo_mensal": lambda ctx: construir_resumo(ctx.df),
+    "dashboard": _dashboard,
+    "relatorio": _relatorio,
+    "relatorio_duckdb": _relatorio_duckdb,
+    "relatorio_mes": _relatorio_mes,
+    "relatorio_mes_duckdb": _relatorio_mes_duckdb,
+    "rollups_pandas": _rollups_pandas,
+    "rollups_duckdb": _rollups_duckdb,
+    # Cópia do snapshot para o DuckDB, refeita a cada nova versão dos dados
+    "carga_duckdb": lambda ctx: ctx.motor.sincronizar("principal", next(ctx.versoes), ctx.df),
+    "exportar_xlsx": _exportar("xlsx"),
+    "exportar_csv": _exportar("csv"),
+    "exportar_parquet": _exportar("parquet"),
+    "importar_csv": _importar_csv,
+    "inatividade": lambda ctx: alertas_inatividade(ctx.usuarios, ultimo_registro(ctx.df), ctx.hoje),
+}
+
+
+# --- MEDIÇÃO ---
+def medir(operacao, ctx, repeticoes=5):
+    """(mediana em ms, pico de memória em MB) de ``operacao(ctx)``."""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        operacao(ctx)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+
+    tracemalloc.start()
+    try:
+        operacao(ctx)
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return statistics.median(tempos), pico / 2 ** 20
+
+
+def executar(escalas, operacoes, repeticoes=5, semente=0):
+    resultados = []
+    for escala in escalas:
+        ctx = Contexto(escala, semente)
+        print(f"\n== {escala}: {len(ctx.usuarios)} usuários, {len(ctx.df)} registros ==")
+        print(f"{'operação':<20}{'mediana (ms)':>14}{'pico (MB)':>12}")
+        for nome in operacoes:
+            ms, mb = medir(OPERACOES[nome], ctx, repeticoes)
+            print(f"{nome:<20}{ms:>14.1f}{mb:>12.1f}")
+            resultados.append({"escala": escala, "registros": len(ctx.df), "operacao": nome,
+                               "mediana_ms": round(ms, 3), "pico_mb": round(mb, 3)})
+    return resultados
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--escalas", nargs="+", choices=list(ESCALAS), default=["pequena", "media"])
+    parser.add_argument("--operacoes", nargs="+", choices=list(OPERACOES), default=list(OPERACOES))
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--json", help="grava os resultados neste arquivo")
+    args = parser.parse_args(argv)
+
+    resultados = executar(args.escalas, args.operacoes, args.repeticoes, args.semente)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,24 @@
+import pandas as pd
+
+
+class ConexaoLocal:
+    """Substituto em memória da conexão GSheets (mesmos ``read``/``update``).
+
+    Permite usar ``BackendGSheets`` sem rede: cada aba é um DataFrame no
+    formato em que a planilha devolve os dados.
+    """
+
+    def __init__(self, abas=None):
+        self.abas = {aba: df.copy() for aba, df in (abas or {}).items()}
+        self.leituras = 0
+        self.gravacoes = 0
+
+    def read(self, worksheet=None, ttl=None, **kwargs):
+        self.leituras += 1
+        if worksheet not in self.abas:
+            return pd.DataFrame()
+        return self.abas[worksheet].copy()
+
+    def update(self, worksheet=None, data=None, **kwargs):
+        self.gravacoes += 1
+        self.abas[worksheet] = data.copy()
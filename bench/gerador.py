@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+
+from constantes import LISTA_LIDERES, LISTA_SETORES
+
+# usuários, anos de histórico
+ESCALAS = {
+    "pequena": (50, 1),
+    "media": (500, 5),
+    "grande": (2000, 5),
+    "milhao": (7000, 5),
+}
+
+TEMAS = [f"Tema {i:02d}" for i in range(1, 41)]
+HORAS = np.array([0.5, 1.0, 1.25, 1.5, 2.0, 2.5, 3.0, 4.0, 8.0])
+
+
+def _ids(n, rng):
+    # Mesmo formato de ``novo_id``, mas reprodutível pela semente
+    return [f"R{v:015x}" for v in rng.choice(16 ** 15, n, replace=False)]
+
+
+def gerar_usuarios(n_usuarios, semente=0):
+    """Aba Usuarios: setores em rodízio, um gestor por setor e um administrador."""
+    rng = np.random.default_rng(semente)
+    setores = LISTA_SETORES[1:]
+    nomes = [f"Colaborador {i:04d}" for i in range(n_usuarios)]
+    perfis = np.full(n_usuarios, "['Comum']", dtype=object)
+    perfis[:len(setores)] = "['Gestor']"
+    perfis[0] = "['Admin']"
+    return pd.DataFrame({
+        "usuario": nomes,
+        "senha": rng.integers(100000, 999999, n_usuarios).astype(str),
+        "perfil": perfis,
+        "setor": [setores[i % len(setores)] for i in range(n_usuarios)],
+        "ID": _ids(n_usuarios, rng),
+    })
+
+
+def gerar_treinamentos(usuarios, anos, ano_final=2025, cursos_por_mes=2.5, semente=0):
+    """Aba Treinamentos no formato lido da planilha (datas em texto DD/MM/AAAA)."""
+    rng = np.random.default_rng(semente)
+    meses = np.array([(ano, mes) for ano in range(ano_final - anos + 1, ano_final + 1) for mes in range(1, 13)])
+    quantidades = rng.poisson(cursos_por_mes, (len(usuarios), len(meses))).ravel()
+    total = int(quantidades.sum())
+
+    pessoa = np.repeat(np.repeat(np.arange(len(usuarios)), len(meses)), quantidades)
+    periodo = np.repeat(np.tile(np.arange(len(meses)), len(usuarios)), quantidades)
+    datas = pd.to_datetime(pd.DataFrame({
+        "year": meses[periodo, 0], "month": meses[periodo, 1], "day": rng.integers(1, 29, total),
+    }))
+    nota_lider = rng.integers(1, 11, total).astype(float)
+    nota_lider[rng.random(total) < 0.3] = np.nan
+
+    df = pd.DataFrame({
+        "ID": _ids(total, rng),
+        "Data": datas.dt.strftime("%d/%m/%Y"),
+        "Funcionário": usuarios["usuario"].to_numpy()[pessoa],
+        "Setor": usuarios["setor"].to_numpy()[pessoa],
+        "Líder": rng.choice(LISTA_LIDERES[1:], total),
+        "Tema": rng.choice(TEMAS, total),
+        "Horas": rng.choice(HORAS, total),
+        "Avaliação": rng.integers(1, 11, total),
+        "Nota_Lider": nota_lider,
+        "Versao": 1,
+    })
+    return df.iloc[np.argsort(datas.to_numpy(), kind="stable")].reset_index(drop=True)
+
+
+def gerar_abas(escala="media", semente=0, ano_final=2025):
+    """Abas Usuarios e Treinamentos sintéticas, reprodutíveis pela ``semente``."""
+    n_usuarios, anos = ESCALAS[escala]
+    usuarios = gerar_usuarios(n_usuarios, semente)
+    return {"Usuarios": usuarios, "Treinamentos": gerar_treinamentos(usuarios, anos, ano_final, semente=semente)}
@@ -0,0 +1,120 @@
+import threading
+import time
+
+
+class Snapshot:
+    """Uma versão carregada de uma aba e as estruturas derivadas dela."""
+
+    def __init__(self, df, versao, lido_em=None, derivados=None, completo_em=None):
+        self.df = df
+        self.versao = versao
+        self.lido_em = time.monotonic() if lido_em is None else lido_em
+        # Última leitura da aba inteira; sincronizações parciais não a renovam
+        self.completo_em = self.lido_em if completo_em is None else completo_em
+        self._derivados = dict(derivados or {})
+        self._lock = threading.Lock()
+
+    def derivado(self, nome, calcular):
+        """Calcula ``calcular(df)`` uma única vez por versão do snapshot."""
+        with self._lock:
+            if nome not in self._derivados:
+                self._derivados[nome] = calcular(self.df)
+            return self._derivados[nome]
+
+
+class SnapshotCache:
+    """Snapshot único por processo de cada aba da planilha.
+
+    Todas as sessões recebem o mesmo DataFrame (sem cópia) e devem tratá-lo
+    como somente leitura. Cada snapshot tem um número de versão: gravações
+    chamam ``publicar`` com os dados já alterados ou ``invalidar`` para que a
+    próxima leitura busque a aba de novo.
+
+    Quando o TTL vence, ``obter`` tenta primeiro ``atualizar(snapshot)``, que
+    traz só o que mudou e devolve ``(df, derivados)`` ou None para ler a aba
+    inteira. A cada ``reconciliar_segundos`` a leitura completa é obrigatória,
+    para pegar alterações feitas direto na planilha.
+    """
+
+    def __init__(self, ttl_segundos=60, reconciliar_segundos=None):
+        self.ttl_segundos = ttl_segundos
+        self.reconciliar_segundos = reconciliar_segundos
+        self._lock = threading.Lock()
+        self._locks_aba = {}
+        self._versoes = {}
+        self._entradas = {}
+
+    def versao(self, aba):
+        with self._lock:
+            return self._versoes.get(aba, 0)
+
+    def atual(self, aba):
+        with self._lock:
+            return self._entradas.get(aba)
+
+    def _fresca(self, entrada, ttl=None):
+        if entrada is None:
+            return False
+        return time.monotonic() - entrada.lido_em < (self.ttl_segundos if ttl is None else ttl)
+
+    def _reconciliar(self, entrada):
+        if self.reconciliar_segundos is None:
+            return False
+        return time.monotonic() - entrada.completo_em >= self.reconciliar_segundos
+
+    def obter(self, aba, carregar, atualizar=None, ttl=None):
+        """Snapshot de ``aba``; ``ttl`` substitui o TTL padrão (``float("inf")`` para dados imutáveis)."""
+        with self._lock:
+            entrada = self._entradas.get(aba)
+            if self._fresca(entrada, ttl):
+                return entrada
+            lock_aba = self._locks_aba.setdefault(aba, threading.Lock())
+
+        # Apenas uma sessão lê a aba; as demais aguardam e reaproveitam o resultado
+        with lock_aba:
+            with self._lock:
+                entrada = self._entradas.get(aba)
+                if self._fresca(entrada, ttl):
+                    return entrada
+                versao_inicial = self._versoes.get(aba, 0)
+
+            resultado = None
+            if atualizar is not None and entrada is not None and not self._reconciliar(entrada):
+                resultado = atualizar(entrada)
+            if resultado is None:
+                snapshot = Snapshot(carregar(), versao_inicial + 1)
+            elif resultado[0] is entrada.df:
+                # Nada mudou: o mesmo snapshot (e a mesma versão) vale por mais um TTL
+                with self._lock:
+                    if self._entradas.get(aba) is entrada:
+                        entrada.lido_em = time.monotonic()
+                return entrada
+            else:
+                snapshot = Snapshot(resultado[0], versao_inicial + 1, derivados=resultado[1], completo_em=entrada.completo_em)
+
+            with self._lock:
+                # Se houve gravação durante a leitura, o resultado já nasce velho
+                if self._versoes.get(aba, 0) == versao_inicial:
+                    self._versoes[aba] = snapshot.versao
+                    self._entradas[aba] = snapshot
+            return snapshot
+
+    def publicar(self, aba, base, df, derivados=None):
+        """Troca o snapshot ``base`` por ``df`` já com a gravação aplicada.
+
+        Se outro snapshot substituiu ``base`` nesse meio-tempo, apenas invalida.
+        O instante da leitura original é mantido para que o TTL continue
+        forçando a releitura periódica da aba.
+        """
+        with self._lock:
+            versao = self._versoes.get(aba, 0) + 1
+            self._versoes[aba] = versao
+            if self._entradas.get(aba) is base and base is not None:
+                self._entradas[aba] = Snapshot(df, versao, base.lido_em, derivados, base.completo_em)
+            else:
+                self._entradas.pop(aba, None)
+
+    def invalidar(self, aba):
+        with self._lock:
+            self._versoes[aba] = self._versoes.get(aba, 0) + 1
+            self._entradas.pop(aba, None)
@@ -0,0 +1 @@
+# Na raiz para o pytest pôr o diretório do app no sys.path: os módulos são importados pelo nome
@@ -0,0 +1,13 @@
+import os
+
+LISTA_SETORES = ["Selecione o Setor...", "Departamento T.I.", "Departamento Pessoal", "Departamento Fiscal", "Departamento Contábil", "Diretoria", "Departamento R.H.", "Departamento Legalização", "Departamento Recepção"]
+LISTA_LIDERES = ["Selecione o Líder...", "Victor Souza", "Thiago Ferreira", "Rafael Pires", "Priscila Barbosa", "Franceli Dario", "Thamiris Afonso", "Ruth Moreira"]
+LISTA_MESES = ["Janeiro", "Fevereiro", "Março", "Abril", "Maio", "Junho", "Julho", "Agosto", "Setembro", "Outubro", "Novembro", "Dezembro"]
+LISTA_NOTAS_VALIDAS = [str(i) for i in range(1, 11)]
+LISTA_NOTAS_CADASTRO = ["Selecione..."] + LISTA_NOTAS_VALIDAS
+LISTA_PERFIS = ["Comum", "Gestor", "Editor", "Admin"]
+LIMITE_INATIVIDADE = int(os.environ.get("LIMITE_INATIVIDADE_DIAS", "15"))
+META_HORAS_MES = 7.0
+# Temas e colaboradores mostrados no gráfico do Dashboard; os demais somam em "Outros"
+LIMITE_TEMAS_GRAFICO = 10
+LIMITE_FUNCIONARIOS_GRAFICO = 12
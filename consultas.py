@@ -0,0 +1,161 @@
+"""Caminhos de dados das páginas, sem dependência do Streamlit.
+
+O app chama estas funções dentro das páginas; o benchmark (``bench``) chama
+as mesmas funções diretamente sobre dados sintéticos.
+"""
+import pandas as pd
+
+from agregados import atualizar_resumo, filtrar_resumo, media_notas
+from armazenamento import garantir_ids
+from constantes import LIMITE_FUNCIONARIOS_GRAFICO, LIMITE_TEMAS_GRAFICO, META_HORAS_MES
+from esquema import COLUNAS_TREINAMENTOS, alinhar_categorias, normalizar_treinamentos
+
+
+# Linhas sem ID (planilhas antigas ou digitadas à mão) recebem um na primeira leitura
+def _completar_ids(backend, aba, df):
+    df, alterado = garantir_ids(df)
+    if alterado:
+        backend.escrever(aba, df)
+    return df
+
+
+def ler_treinamentos(backend, anos_arquivados=()):
+    """Registros da aba Treinamentos, sem os anos que já têm arquivo próprio."""
+    df = backend.ler("Treinamentos")
+    if df.empty or len(df.columns) < 2:
+        return normalizar_treinamentos(pd.DataFrame(columns=COLUNAS_TREINAMENTOS))
+    df = normalizar_treinamentos(_completar_ids(backend, "Treinamentos", df))
+    return df[~df["Ano"].isin(anos_arquivados)] if len(anos_arquivados) else df
+
+
+def ler_arquivo_treinamentos(backend, ano):
+    return normalizar_treinamentos(backend.ler_arquivo("Treinamentos", ano))
+
+
+def mesclar_treinamentos(df, resumo, alteradas=None, removidos=()):
+    """Aplica a um snapshot linhas novas/alteradas (já normalizadas) e IDs removidos.
+
+    Linhas alteradas ficam na posição original e as novas vão para o fim.
+    Retorna ``(df, resumo)`` novos; os recebidos não são alterados.
+    """
+    removidos = [i for i in removidos if i in df.index]
+    if alteradas is None:
+        alteradas = df.iloc[:0]
+    existentes = alteradas.index.isin(df.index)
+    antigos = df.loc[removidos + alteradas.index[existentes].tolist()]
+
+    novo, alteradas = alinhar_categorias(df, alteradas)
+    if removidos:
+        novo = novo.drop(removidos)
+    if existentes.any():
+        novo = novo.copy()
+        novo.loc[alteradas.index[existentes], alteradas.columns] = alteradas[existentes]
+    if not existentes.all():
+        novo = pd.concat([novo, alteradas[~existentes]])
+    return novo, atualizar_resumo(resumo, removidos=antigos, adicionados=alteradas)
+
+
+def sincronizar_treinamentos(backend, df, resumo, anos_arquivados=()):
+    """Traz para o snapshot só o que mudou no backend desde a leitura.
+
+    Retorna ``(df, resumo)`` (os mesmos objetos se nada mudou) ou None quando
+    é preciso ler a aba inteira.
+    """
+    delta = backend.ler_alteracoes("Treinamentos", df["Versao"])
+    if delta is None:
+        return None
+    alteradas, removidos = delta
+    if alteradas.empty and not removidos:
+        return df, resumo
+    alteradas = normalizar_treinamentos(alteradas)
+    return mesclar_treinamentos(df, resumo, alteradas[~alteradas["Ano"].isin(anos_arquivados)], removidos)
+
+
+def ler_usuarios(backend):
+    df = backend.ler("Usuarios")
+    return df if df.empty else _completar_ids(backend, "Usuarios", df)
+
+
+def funcionarios_no_resumo(resumo, setor=None):
+    """Funcionários com algum registro (no setor, se informado), em ordem alfabética."""
+    nomes = filtrar_resumo(resumo, setor=setor).index.get_level_values("Funcionário").unique()
+    return sorted(nome for nome in nomes if nome)
+
+
+def pares_setor_funcionario(df):
+    """Pares (Setor, Funcionário) distintos dos registros, para listar equipes sem juntar o histórico."""
+    pares = df[["Setor", "Funcionário"]].dropna().drop_duplicates()
+    return frozenset(zip(pares["Setor"].astype(str), pares["Funcionário"].astype(str)))
+
+
+def funcionarios_da_equipe(pares, setor=None):
+    """Funcionários dos ``pares`` (no setor, se informado), em ordem alfabética."""
+    return sorted({funcionario for s, funcionario in pares if funcionario and (setor is None or s == setor)})
+
+
+def registros_dashboard(df_periodo, funcionarios, avaliados=None):
+    """Registros do mês dos ``funcionarios``; ``avaliados`` True/False filtra pela nota do líder."""
+    user_df = df_periodo[df_periodo["Funcionário"].isin(funcionarios)]
+    if avaliados is not None:
+        user_df = user_df[user_df["Nota_Lider"].notna() == avaliados]
+    return user_df.copy()
+
+
+def horas_dashboard(resumo_mes, funcionarios, avaliados=None):
+    linhas = filtrar_resumo(resumo_mes, funcionarios=funcionarios)
+    if avaliados is None:
+        return linhas["Horas"].sum()
+    if avaliados:
+        return linhas["Horas_Avaliadas"].sum()
+    return linhas["Horas"].sum() - linhas["Horas_Avaliadas"].sum()
+
+
+def _principais(soma, coluna, limite):
+    # Os ``limite`` valores com mais horas, na ordem; o restante vira "Outros", no fim
+    totais = soma.groupby(coluna, observed=True)["Horas"].sum().sort_values(ascending=False, kind="stable")
+    principais = [str(valor) for valor in totais.index[:limite]]
+    ordem = principais + (["Outros"] if len(totais) > limite else [])
+    return pd.Categorical(soma[coluna].astype(str).where(soma[coluna].isin(principais), "Outros"), ordem)
+
+
+def horas_por_tema(registros, por_funcionario=False, limite=LIMITE_TEMAS_GRAFICO,
+                   limite_funcionarios=LIMITE_FUNCIONARIOS_GRAFICO):
+    """Horas por Tema (e Funcionário), dos temas com mais horas para os com menos.
+
+    Só os ``limite`` temas (e ``limite_funcionarios`` funcionários) com mais
+    horas aparecem; os demais somam em "Outros", na última posição. O
+    tamanho do resultado não depende do número de registros.
+    """
+    chaves = ["Tema", "Funcionário"] if por_funcionario else ["Tema"]
+    soma = registros.groupby(chaves, observed=True)["Horas"].sum().reset_index()
+    soma["Tema"] = _principais(soma, "Tema", limite)
+    if por_funcionario:
+        soma["Funcionário"] = _principais(soma, "Funcionário", limite_funcionarios)
+    return soma.groupby(chaves, observed=True, sort=True)["Horas"].sum().reset_index()
+
+
+def metas_por_colaborador(resumo_mes, colaboradores, meta=META_HORAS_MES):
+    """Divide ``colaboradores`` entre quem bateu a meta de horas do mês e quem está pendente."""
+    horas = resumo_mes.groupby(level="Funcionário")["Horas"].sum().reindex(colaboradores, fill_value=0).reset_index()
+    horas.columns = ["Nome", "Total_Horas"]
+    return horas[horas["Total_Horas"] >= meta], horas[horas["Total_Horas"] < meta]
+
+
+def filtrar_relatorio(df, resumo, setor=None, funcionario=None, mes=None, ano=None):
+    """Aplica os filtros do Relatório Geral aos registros e ao resumo mensal; ``None`` não filtra."""
+    mascara = pd.Series(True, index=df.index)
+    if ano is not None:
+        mascara &= df["Ano"] == ano
+    if setor is not None:
+        mascara &= df["Setor"] == setor
+    if funcionario is not None:
+        mascara &= df["Funcionário"] == funcionario
+    if mes is not None:
+        mascara &= df["Mes"] == mes
+    funcionarios = None if funcionario is None else [funcionario]
+    return df[mascara], filtrar_resumo(resumo, ano=ano, mes=mes, setor=setor, funcionarios=funcionarios)
+
+
+def totais_relatorio(resumo_rel):
+    """Total de cursos, carga horária e média das notas do líder."""
+    return resumo_rel["Cursos"].sum(), resumo_rel["Horas"].sum(), media_notas(resumo_rel)
@@ -0,0 +1,146 @@
+import collections
+import itertools
+import json
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+
+import pandas as pd
+
+
+class Rerun:
+    """Medições de uma execução do script, guardadas até a página ser conhecida."""
+
+    def __init__(self, numero, pagina="Login"):
+        self.numero = numero
+        self.pagina = pagina
+        self.inicio = time.perf_counter()
+        self.iniciado_em = datetime.now().isoformat(timespec="seconds")
+        self.spans = []
+        self.chamadas = collections.Counter()
+
+    def total_chamadas(self):
+        return sum(self.chamadas.values())
+
+
+class Desempenho:
+    """Spans de tempo por rerun, num buffer circular compartilhado pelo processo.
+
+    Cada sessão abre um ``Rerun`` no início do script (``iniciar``) e o fecha no
+    fim (``encerrar``). Reruns interrompidos por ``st.rerun()`` são fechados na
+    execução seguinte da mesma sessão, sem o span total. O rerun em andamento
+    fica no thread local, pois o Streamlit executa cada sessão na sua thread.
+    Com ``arquivo``, cada medição também é anexada como uma linha JSON.
+    """
+
+    def __init__(self, capacidade=5000, arquivo=None):
+        self.arquivo = arquivo
+        self._lock = threading.Lock()
+        self._entradas = collections.deque(maxlen=capacidade)
+        self._numeros = itertools.count(1)
+        self._local = threading.local()
+
+    @property
+    def capacidade(self):
+        return self._entradas.maxlen
+
+    def iniciar(self, pendente=None):
+        if pendente is not None:
+            self._registrar(pendente)
+        rerun = Rerun(next(self._numeros))
+        self._local.rerun = rerun
+        return rerun
+
+    def encerrar(self, rerun):
+        if rerun is None:
+            return
+        rerun.spans.append(("rerun", time.perf_counter() - rerun.inicio, rerun.total_chamadas()))
+        self._registrar(rerun, dict(rerun.chamadas))
+        if getattr(self._local, "rerun", None) is rerun:
+            self._local.rerun = None
+
+    def _registrar(self, rerun, chamadas_por_metodo=None):
+        entradas = [{"rerun": rerun.numero, "inicio": rerun.iniciado_em, "pagina": rerun.pagina, "operacao": operacao,
+                     "ms": round(segundos * 1000, 3), "chamadas_backend": chamadas}
+                    for operacao, segundos, chamadas in rerun.spans]
+        rerun.spans = []
+        if chamadas_por_metodo and entradas:
+            entradas[-1]["chamadas_por_metodo"] = chamadas_por_metodo
+        with self._lock:
+            self._entradas.extend(entradas)
+            if self.arquivo and entradas:
+                with open(self.arquivo, "a", encoding="utf-8") as f:
+                    f.writelines(json.dumps(e, ensure_ascii=False) + "\n" for e in entradas)
+
+    @contextmanager
+    def medir(self, operacao):
+        rerun = getattr(self._local, "rerun", None)
+        if rerun is None:
+            yield
+            return
+        chamadas = rerun.total_chamadas()
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            rerun.spans.append((operacao, time.perf_counter() - inicio, rerun.total_chamadas() - chamadas))
+
+    def medido(self, operacao):
+        """Decorador: cada chamada da função vira um span ``operacao``."""
+        def decorar(funcao):
+            @wraps(funcao)
+            def medida(*args, **kwargs):
+                with self.medir(operacao):
+                    return funcao(*args, **kwargs)
+            return medida
+        return decorar
+
+    def contar(self, metodo):
+        rerun = getattr(self._local, "rerun", None)
+        if rerun is not None:
+            rerun.chamadas[metodo] += 1
+
+    def entradas(self):
+        with self._lock:
+            return list(self._entradas)
+
+    def limpar(self):
+        with self._lock:
+            self._entradas.clear()
+
+
+class BackendMedido:
+    """Repassa tudo ao backend, contando as chamadas no rerun em andamento."""
+
+    def __init__(self, backend, desempenho):
+        self._backend = backend
+        self._desempenho = desempenho
+
+    def __getattr__(self, nome):
+        atributo = getattr(self._backend, nome)
+        if not callable(atributo):
+            return atributo
+
+        @wraps(atributo)
+        def chamar(*args, **kwargs):
+            self._desempenho.contar(nome)
+            return atributo(*args, **kwargs)
+        return chamar
+
+
+def percentis(entradas):
+    """p50/p95 por página e operação, das operações mais lentas para as mais rápidas."""
+    colunas = ["Página", "Operação", "Execuções", "p50 (ms)", "p95 (ms)", "Chamadas ao backend (média)"]
+    if not entradas:
+        return pd.DataFrame(columns=colunas)
+    df = pd.DataFrame(entradas)
+    grupos = df.groupby(["pagina", "operacao"])
+    tabela = pd.DataFrame({
+        "Execuções": grupos.size(),
+        "p50 (ms)": grupos["ms"].quantile(0.5),
+        "p95 (ms)": grupos["ms"].quantile(0.95),
+        "Chamadas ao backend (média)": grupos["chamadas_backend"].mean(),
+    }).round(1).rename_axis(["Página", "Operação"]).reset_index()
+    return tabela.sort_values("p95 (ms)", ascending=False)[colunas]
@@ -0,0 +1,61 @@
+import pandas as pd
+
+from constantes import LISTA_LIDERES, LISTA_SETORES
+from formatacao import notas_para_int
+
+COLUNAS_TREINAMENTOS = ["ID", "Data", "Funcionário", "Setor", "Líder", "Tema", "Horas", "Avaliação", "Nota_Lider", "Versao"]
+COLUNAS_CATEGORICAS = ["Funcionário", "Setor", "Líder", "Tema"]
+# Calculadas na carga; nunca são gravadas de volta no armazenamento
+COLUNAS_DERIVADAS = ["Ano", "Mes"]
+
+
+def _categorizar(serie, conhecidas=()):
+    texto = serie.astype("string")
+    extras = sorted(set(texto.dropna().unique()) - set(conhecidas))
+    return texto.astype(pd.CategoricalDtype(list(conhecidas) + extras))
+
+
+def normalizar_treinamentos(df, setores=LISTA_SETORES[1:], lideres=LISTA_LIDERES[1:]):
+    """Aplica o esquema tipado aos registros de treinamento.
+
+    Funcionário, Setor, Líder e Tema viram categorias (Setor e Líder na ordem
+    de ``setores``/``lideres``), notas viram Int8 e Ano/Mes são extraídos da
+    Data uma única vez. O índice passa a ser o ID do registro.
+    """
+    df["Data"] = pd.to_datetime(df["Data"], dayfirst=True, errors="coerce")
+    df["Horas"] = pd.to_numeric(df["Horas"], errors="coerce").fillna(0).astype(float)
+    df["Avaliação"] = notas_para_int(df["Avaliação"])
+    df["Nota_Lider"] = notas_para_int(df["Nota_Lider"])
+    df["Versao"] = pd.to_numeric(df["Versao"], errors="coerce").fillna(1).astype("int32")
+    df["Ano"] = df["Data"].dt.year.fillna(0).astype("int16")
+    df["Mes"] = df["Data"].dt.month.fillna(0).astype("int8")
+
+    conhecidas = {"Setor": setores, "Líder": lideres}
+    for col in COLUNAS_CATEGORICAS:
+        df[col] = _categorizar(df[col], conhecidas.get(col, ()))
+    df.index = df["ID"].astype(str).to_numpy()
+    return df
+
+
+def alinhar_categorias(base, novos):
+    """Devolve cópias de ``base`` e ``novos`` com as mesmas categorias.
+
+    Necessário antes de concatenar ou atribuir linhas: categorias diferentes
+    fariam o pandas voltar as colunas para texto.
+    """
+    base, novos = base.copy(deep=False), novos.copy()
+    for col in COLUNAS_CATEGORICAS:
+        extras = novos[col].cat.categories.difference(base[col].cat.categories)
+        if len(extras):
+            base[col] = base[col].cat.add_categories(extras)
+        novos[col] = novos[col].astype(base[col].dtype)
+    return base, novos
+
+
+def indexar_periodos(df):
+    """Posições das linhas de cada (Ano, Mes), para recortar um mês sem varrer tudo."""
+    return df.groupby(["Ano", "Mes"], sort=False).indices
+
+
+def registros_do_periodo(df, indice, ano, mes):
+    return df.iloc[indice.get((ano, mes), [])]
@@ -0,0 +1,54 @@
+import io
+
+COLUNAS_EXPORTACAO = ["Data", "Funcionário", "Setor", "Líder", "Tema", "Horas", "Avaliação", "Nota_Lider"]
+TAMANHO_BLOCO = 5000
+
+FORMATOS = {
+    "xlsx": ("📥 BAIXAR EXCEL", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "csv": ("📄 BAIXAR CSV", "text/csv"),
+    "parquet": ("🗂️ BAIXAR PARQUET", "application/vnd.apache.parquet"),
+}
+
+
+def _blocos(df):
+    """Percorre o relatório em blocos já no formato de célula (datas em texto, vazios como None)."""
+    for inicio in range(0, len(df), TAMANHO_BLOCO):
+        bloco = df.iloc[inicio:inicio + TAMANHO_BLOCO].copy()
+        bloco["Data"] = bloco["Data"].dt.strftime("%d/%m/%Y")
+        bloco = bloco.astype(object)
+        yield bloco.where(bloco.notna(), None).itertuples(index=False)
+
+
+def _excel(df):
+    from openpyxl import Workbook
+
+    # write_only grava as linhas em fluxo, sem montar a planilha inteira na memória
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Relatório")
+    ws.append(list(df.columns))
+    for linhas in _blocos(df):
+        for linha in linhas:
+            ws.append(linha)
+    saida = io.BytesIO()
+    wb.save(saida)
+    return saida.getvalue()
+
+
+def _csv(df):
+    saida = io.BytesIO()
+    df.to_csv(saida, index=False, sep=";", decimal=",", date_format="%d/%m/%Y", encoding="utf-8-sig", chunksize=TAMANHO_BLOCO)
+    return saida.getvalue()
+
+
+def _parquet(df):
+    saida = io.BytesIO()
+    df.to_parquet(saida, index=False)
+    return saida.getvalue()
+
+
+def gerar_exportacao(df, formato):
+    """Conteúdo do arquivo de relatório em ``formato`` ("xlsx", "csv" ou "parquet")."""
+    geradores = {"xlsx": _excel, "csv": _csv, "parquet": _parquet}
+    if formato not in geradores:
+        raise ValueError(f"Formato de exportação desconhecido: {formato}")
+    return geradores[formato](df[COLUNAS_EXPORTACAO])
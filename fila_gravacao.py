@@ -0,0 +1,333 @@
+import collections
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from armazenamento import COL_ID, COL_VERSAO, ConflitoEdicao
+
+CAMINHO_DIARIO_PADRAO = os.path.join("dados", "fila_gravacao.jsonl")
+CODIGOS_TRANSITORIOS = {408, 429, 500, 502, 503, 504}
+# Máximo de linhas por append enviado: uma importação grande vai em várias chamadas, e uma
+# falha transitória reenvia só o lote que falhou
+LINHAS_POR_APPEND = 2000
+
+log = logging.getLogger(__name__)
+
+
+def transitorio(erro):
+    """Cota excedida, erro 5xx, falha de rede/arquivo ou banco local ocupado: vale tentar de novo.
+
+    Outros erros do SQLite ("no such column", "no such table") não passam com
+    o tempo e falham a operação na hora.
+    """
+    if isinstance(erro, ConflitoEdicao):
+        return False
+    codigo = getattr(getattr(erro, "response", None), "status_code", None)
+    if codigo is not None:
+        return codigo in CODIGOS_TRANSITORIOS
+    if isinstance(erro, sqlite3.OperationalError):
+        mensagem = str(erro).lower()
+        return "locked" in mensagem or "busy" in mensagem
+    return isinstance(erro, OSError)
+
+
+def _valor(valor):
+    if valor is None or (pd.api.types.is_scalar(valor) and pd.isna(valor)):
+        return None
+    if isinstance(valor, datetime):
+        return valor.strftime("%d/%m/%Y")
+    if hasattr(valor, "item"):
+        return valor.item()
+    return valor
+
+
+def _linhas(df):
+    return [{col: _valor(v) for col, v in linha.items()} for linha in df.to_dict("records")]
+
+
+# --- COALESCÊNCIA ---
+def _versao_confere(versao_esperada, versao):
+    return versao_esperada is None or int(versao_esperada) == int(versao)
+
+
+def coalescer(operacoes, linhas_por_append=LINHAS_POR_APPEND):
+    """Reduz ``operacoes`` ao menor número de chamadas com o mesmo efeito final.
+
+    Por aba: uma escrita completa descarta o que veio antes; inserções viram
+    ``append_rows`` de até ``linhas_por_append`` linhas; edições seguidas do mesmo registro são somadas (com
+    ``incremento`` de Versao) e edições/exclusões de linhas ainda não enviadas
+    são aplicadas direto nelas. Operações cuja Versao esperada não segue a
+    anterior ficam separadas para o backend acusar o conflito.
+    """
+    por_aba = {}
+    for op in operacoes:
+        aba = por_aba.setdefault(op["aba"], {"escrever": None, "novas": {}, "outras": []})
+        origens = op.get("origens", [])
+        if op["tipo"] == "escrever":
+            aba.update(escrever=dict(op), novas={}, outras=[])
+            continue
+        if op["tipo"] == "append":
+            for linha in op["linhas"]:
+                aba["novas"][str(linha[COL_ID])] = (dict(linha), set(origens), op.get("verificar", False))
+            continue
+
+        id_registro = str(op["id"])
+        nova = aba["novas"].get(id_registro)
+        if nova is not None and _versao_confere(op.get("versao"), nova[0].get(COL_VERSAO) or 1):
+            linha, origens_linha, verificar = nova
+            origens_linha.update(origens)
+            if op["tipo"] == "delete":
+                del aba["novas"][id_registro]
+            else:
+                linha.update(op["campos"])
+                linha[COL_VERSAO] = int(linha.get(COL_VERSAO) or 1) + op.get("incremento", 1)
+            continue
+
+        anterior = next((o for o in reversed(aba["outras"]) if str(o["id"]) == id_registro), None)
+        if (anterior is not None and anterior["tipo"] == "update" and anterior.get("versao") is not None
+                and _versao_confere(op.get("versao"), int(anterior["versao"]) + anterior["incremento"])):
+            anterior["origens"] = sorted(set(anterior["origens"]) | set(origens))
+            if op["tipo"] == "delete":
+                anterior.update(tipo="delete", campos=None, incremento=None)
+            else:
+                anterior["campos"] = dict(anterior["campos"], **op["campos"])
+                anterior["incremento"] += op.get("incremento", 1)
+            continue
+        op = dict(op, origens=list(origens))
+        if op["tipo"] == "update":
+            op.setdefault("incremento", 1)
+        aba["outras"].append(op)
+
+    resultado = []
+    for nome, aba in por_aba.items():
+        if aba["escrever"] is not None:
+            resultado.append(aba["escrever"])
+        novas = list(aba["novas"].values())
+        for inicio in range(0, len(novas), linhas_por_append):
+            lote = novas[inicio:inicio + linhas_por_append]
+            resultado.append({"tipo": "append", "aba": nome, "linhas": [linha for linha, _, _ in lote],
+                              "origens": sorted(set().union(*(o for _, o, _ in lote))),
+                              "verificar": any(v for _, _, v in lote)})
+        resultado.extend(aba["outras"])
+    return resultado
+
+
+def aplicar(df, op):
+    """Efeito de ``op`` sobre a aba ``df`` como lida do backend (para leituras verem a fila)."""
+    if op["tipo"] == "escrever":
+        return pd.DataFrame(op["linhas"])
+    if op["tipo"] == "append":
+        return pd.concat([df, pd.DataFrame(op["linhas"])], ignore_index=True)
+    if df.empty or COL_ID not in df.columns:
+        return df
+    alvo = df[COL_ID].astype(str) == str(op["id"])
+    if op["tipo"] == "delete":
+        return df[~alvo]
+    df = df.copy()
+    for col, valor in op["campos"].items():
+        df[col] = df[col].astype(object) if col in df.columns else None
+        df.loc[alvo, col] = valor
+    if COL_VERSAO in df.columns:
+        versoes = pd.to_numeric(df[COL_VERSAO], errors="coerce").fillna(1)
+        df[COL_VERSAO] = versoes.where(~alvo, versoes + op["incremento"]).astype(int)
+    return df
+
+
+class FilaGravacao:
+    """Backend que grava em segundo plano.
+
+    ``append_rows``, ``update_row``, ``delete_row`` e ``escrever`` só anotam a
+    operação num diário local (JSON lines) e retornam; uma thread aplica as
+    pendências no ``backend`` real, já coalescidas, repetindo com espera
+    exponencial quando o erro é transitório (cota, 5xx, rede), até
+    ``max_tentativas`` vezes. Operações rejeitadas (conflito de Versao, dados
+    inválidos) ou que esgotaram as tentativas vão para ``falhas`` e
+    ``ao_falhar`` é chamado. ``ler`` devolve a aba com as pendências aplicadas,
+    então quem gravou enxerga a própria alteração mesmo antes do envio.
+    O diário é relido na criação: nada se perde se o processo cair.
+    """
+
+    def __init__(self, backend, caminho_diario=CAMINHO_DIARIO_PADRAO, janela_segundos=1.0,
+                 espera_inicial=1.0, espera_maxima=60.0, max_tentativas=8, ao_falhar=None):
+        self.backend = backend
+        self.caminho_diario = caminho_diario
+        self.janela_segundos = janela_segundos
+        self.espera_inicial = espera_inicial
+        self.espera_maxima = espera_maxima
+        self.max_tentativas = max_tentativas
+        self.ao_falhar = ao_falhar
+        self.falhas = collections.deque(maxlen=200)
+        self._lock = threading.Lock()
+        self._lock_backend = threading.Lock()
+        self._pendencias = threading.Condition(self._lock)
+        self._fila = self._ler_diario()
+        self._ocioso = threading.Event()
+        self._thread = threading.Thread(target=self._trabalhar, name="fila-gravacao", daemon=True)
+        self._thread.start()
+
+    # --- DIÁRIO ---
+    def _ler_diario(self):
+        pasta = os.path.dirname(self.caminho_diario)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        if not os.path.exists(self.caminho_diario):
+            return []
+        with open(self.caminho_diario, encoding="utf-8") as f:
+            operacoes = [json.loads(linha) for linha in f if linha.strip()]
+        # Uma inserção pode ter chegado à planilha antes da queda: confere os IDs antes de reenviar
+        return [dict(op, verificar=True) if op["tipo"] == "append" else op for op in operacoes]
+
+    def _regravar_diario(self):
+        temporario = self.caminho_diario + ".tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(op, ensure_ascii=False) + "\n" for op in self._fila)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporario, self.caminho_diario)
+
+    def _enfileirar(self, op):
+        with self._lock:
+            with open(self.caminho_diario, "a", encoding="utf-8") as f:
+                f.write(json.dumps(op, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._fila.append(op)
+            self._ocioso.clear()
+            self._pendencias.notify()
+
+    # --- INTERFACE DE BACKEND ---
+    def ler(self, aba):
+        # Com o backend travado nenhuma pendência é concluída durante a leitura
+        with self._lock_backend:
+            df = self.backend.ler(aba)
+            with self._lock:
+                pendentes = [op for op in self._fila if op["aba"] == aba]
+        for op in pendentes:
+            df = aplicar(df, op)
+        return df
+
+    def ler_alteracoes(self, aba, versoes):
+        # Com pendências na fila o snapshot pode estar à frente do backend: lê tudo e aplica a fila
+        with self._lock_backend:
+            with self._lock:
+                if any(op["aba"] == aba for op in self._fila):
+                    return None
+            return self.backend.ler_alteracoes(aba, versoes)
+
+    # Arquivos de anos encerrados são somente leitura: não passam pela fila
+    def anos_arquivados(self, aba):
+        return self.backend.anos_arquivados(aba)
+
+    def ler_arquivo(self, aba, ano):
+        return self.backend.ler_arquivo(aba, ano)
+
+    def escrever(self, aba, df, origem=None):
+        self._enfileirar({"tipo": "escrever", "aba": aba, "linhas": _linhas(df), "origens": [origem] if origem else []})
+
+    def append_rows(self, aba, df, origem=None):
+        self._enfileirar({"tipo": "append", "aba": aba, "linhas": _linhas(df), "origens": [origem] if origem else []})
+
+    def update_row(self, aba, id_registro, campos, versao_esperada=None, origem=None):
+        self._enfileirar({"tipo": "update", "aba": aba, "id": str(id_registro), "campos": {c: _valor(v) for c, v in campos.items()},
+                          "versao": _valor(versao_esperada), "incremento": 1, "origens": [origem] if origem else []})
+
+    def delete_row(self, aba, id_registro, versao_esperada=None, origem=None):
+        self._enfileirar({"tipo": "delete", "aba": aba, "id": str(id_registro), "versao": _valor(versao_esperada),
+                          "origens": [origem] if origem else []})
+
+    def pendentes(self):
+        with self._lock:
+            return len(self._fila)
+
+    def aguardar(self, timeout=None):
+        """Espera a fila esvaziar; retorna False se o tempo acabar antes."""
+        return self._ocioso.wait(timeout)
+
+    def falhas_de(self, origem):
+        """Remove e devolve as falhas das gravações feitas por ``origem``."""
+        with self._lock:
+            minhas = [f for f in self.falhas if origem in f["origens"]]
+            for falha in minhas:
+                self.falhas.remove(falha)
+        return minhas
+
+    # --- ENVIO ---
+    def _executar(self, op):
+        df = pd.DataFrame(op["linhas"]) if op["tipo"] in ("append", "escrever") else None
+        if op["tipo"] == "escrever":
+            self.backend.escrever(op["aba"], df)
+        elif op["tipo"] == "append":
+            if op.get("verificar"):
+                gravados = self.backend.ler(op["aba"])
+                if COL_ID in gravados.columns:
+                    df = df[~df[COL_ID].astype(str).isin(gravados[COL_ID].astype(str))]
+            if not df.empty:
+                self.backend.append_rows(op["aba"], df)
+        elif op["tipo"] == "update":
+            self.backend.update_row(op["aba"], op["id"], op["campos"], op.get("versao"), op["incremento"])
+        else:
+            self.backend.delete_row(op["aba"], op["id"], op.get("versao"))
+
+    def _concluir(self, op, erro=None):
+        with self._lock:
+            self._fila.remove(op)
+            if erro is not None:
+                self.falhas.append({"tipo": op["tipo"], "aba": op["aba"], "origens": op.get("origens", []), "erro": str(erro)})
+            self._regravar_diario()
+            if not self._fila:
+                self._ocioso.set()
+        if erro is not None and self.ao_falhar is not None:
+            self.ao_falhar(op, erro)
+
+    def _trabalhar(self):
+        tentativas = 0
+        while True:
+            with self._lock:
+                if not self._fila:
+                    self._ocioso.set()
+                while not self._fila:
+                    self._pendencias.wait()
+            # Espera um pouco para juntar as gravações de um mesmo momento
+            time.sleep(self.janela_segundos)
+            while True:
+                try:
+                    with self._lock:
+                        if not self._fila:
+                            break
+                        self._fila = coalescer(self._fila)
+                        op = self._fila[0]
+                    tentativas = self._enviar(op, tentativas)
+                except Exception:
+                    # Falha da própria fila (diário sem espaço em disco, por exemplo): a thread
+                    # não pode morrer, senão as gravações param de chegar ao backend
+                    log.exception("Erro na fila de gravação; nova tentativa em instantes")
+                    tentativas += 1
+                    self._esperar(tentativas)
+
+    def _esperar(self, tentativas):
+        espera = min(self.espera_maxima, self.espera_inicial * 2 ** (tentativas - 1))
+        time.sleep(espera * random.uniform(0.5, 1.0))
+
+    def _enviar(self, op, tentativas):
+        """Envia ``op`` ao backend; devolve quantas tentativas seguidas já falharam."""
+        try:
+            with self._lock_backend:
+                self._executar(op)
+        except Exception as erro:
+            tentativas += 1
+            if transitorio(erro) and tentativas < self.max_tentativas:
+                if op["tipo"] == "append":
+                    op["verificar"] = True
+                self._esperar(tentativas)
+                return tentativas
+            self._concluir(op, erro)
+        else:
+            self._concluir(op)
+        return 0
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+
+NOTAS_VALIDAS = np.arange(1, 11)
+
+
+def notas_para_int(serie):
+    """Converte notas ('7', '7.0', 7.0, '-', vazio) em Int8, com <NA> fora de 1 a 10."""
+    numeros = pd.to_numeric(serie, errors="coerce")
+    return numeros.where(numeros.isin(NOTAS_VALIDAS)).astype("Int8")
+
+
+def notas_para_texto(serie, vazio="-"):
+    return serie.astype("string").fillna(vazio)
+
+
+def formatar_horas(serie):
+    """Versão vetorizada de ``format_to_time``: horas decimais em HH:MM:SS.
+
+    Repete as mesmas operações de ponto flutuante, arredondamento (meio para o
+    par) e transporte de 60 s/60 min, então o texto gerado é idêntico.
+    """
+    valores = np.asarray(serie, dtype=float)
+    horas = np.trunc(valores)
+    minutos_dec = (valores - horas) * 60
+    minutos = np.trunc(minutos_dec)
+    segundos = np.round((minutos_dec - minutos) * 60)
+
+    transbordo = segundos == 60
+    segundos[transbordo] = 0
+    minutos[transbordo] += 1
+    transbordo = minutos == 60
+    minutos[transbordo] = 0
+    horas[transbordo] += 1
+
+    def _duas_casas(valores):
+        return pd.Series(valores.astype(np.int64)).astype(str).str.zfill(2)
+
+    texto = _duas_casas(horas) + ":" + _duas_casas(minutos) + ":" + _duas_casas(segundos)
+    return pd.Series(texto.to_numpy(), index=serie.index if isinstance(serie, pd.Series) else None)
@@ -0,0 +1,201 @@
+import csv
+import io
+from zipfile import BadZipFile
+from datetime import date, datetime, time, timedelta
+
+import pandas as pd
+
+from armazenamento import novo_id
+from constantes import LISTA_LIDERES, LISTA_NOTAS_VALIDAS
+from fila_gravacao import LINHAS_POR_APPEND
+
+COLUNAS_IMPORTACAO = ["Data", "Funcionário", "Líder", "Tema", "Horas", "Avaliação"]
+# Linhas lidas e validadas de cada vez, e linhas por append enviado à planilha
+TAMANHO_BLOCO = 5000
+TAMANHO_LOTE = LINHAS_POR_APPEND
+_HORAS = r"^\s*(\d{1,2}):(\d{1,2}):(\d{1,2})\s*$"
+
+
+def chaves_registros(df):
+    """Chave de duplicidade de cada registro: dia, funcionário, tema (sem caixa) e segundos de curso.
+
+    Aceita a Data já em DD/MM/AAAA (linhas importadas) ou como data (snapshot).
+    """
+    dia = df["Data"] if df["Data"].dtype.kind not in "mM" else df["Data"].dt.strftime("%d/%m/%Y")
+    dia = dia.fillna("")
+    tema = df["Tema"].astype(str).str.strip().str.lower()
+    segundos = (df["Horas"].astype(float) * 3600).round().astype("int64").astype(str)
+    return dia + "|" + df["Funcionário"].astype(str) + "|" + tema + "|" + segundos
+
+
+def _celula(valor):
+    """Célula do Excel como texto, com datas e horários no formato da planilha."""
+    if valor is None:
+        return ""
+    if isinstance(valor, (datetime, date)):
+        return valor.strftime("%d/%m/%Y")
+    if isinstance(valor, time):
+        return valor.strftime("%H:%M:%S")
+    if isinstance(valor, timedelta):
+        segundos = int(valor.total_seconds())
+        return f"{segundos // 3600}:{segundos % 3600 // 60:02d}:{segundos % 60:02d}"
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return str(valor)
+
+
+def _blocos_csv(arquivo):
+    amostra = arquivo.read(4096)
+    arquivo.seek(0)
+    if isinstance(amostra, bytes):
+        amostra = amostra.decode("utf-8-sig", errors="ignore")
+    if not amostra.strip():
+        # Arquivo vazio: sem cabeçalho, cai no erro de colunas ausentes como no Excel
+        yield pd.DataFrame()
+        return
+    # O CSV exportado pelo app usa ";"; arquivos feitos à mão costumam vir com ","
+    try:
+        sep = csv.Sniffer().sniff(amostra.splitlines()[0] if amostra else "", delimiters=";,\t").delimiter
+    except csv.Error:
+        sep = ";"
+    yield from pd.read_csv(arquivo, sep=sep, dtype=str, keep_default_na=False, encoding="utf-8-sig",
+                           skipinitialspace=True, chunksize=TAMANHO_BLOCO)
+
+
+def _blocos_excel(arquivo):
+    from openpyxl import load_workbook
+
+    # read_only percorre as linhas em fluxo, sem carregar a pasta inteira na memória
+    try:
+        wb = load_workbook(arquivo, read_only=True, data_only=True)
+    except BadZipFile as e:
+        raise ValueError("Arquivo Excel inválido (use .xlsx)") from e
+    try:
+        linhas = wb.worksheets[0].iter_rows(values_only=True)
+        cabecalho = [_celula(c).strip() for c in next(linhas, ())]
+        bloco, enviados = [], 0
+        for linha in linhas:
+            if all(c is None or c == "" for c in linha):
+                continue
+            bloco.append([_celula(c) for c in linha[:len(cabecalho)]])
+            if len(bloco) == TAMANHO_BLOCO:
+                yield pd.DataFrame(bloco, columns=cabecalho)
+                bloco, enviados = [], enviados + 1
+        # Só o cabeçalho também gera um bloco, para as colunas serem conferidas
+        if bloco or not enviados:
+            yield pd.DataFrame(bloco, columns=cabecalho)
+    finally:
+        wb.close()
+
+
+def ler_blocos(arquivo, nome):
+    """Blocos de até ``TAMANHO_BLOCO`` linhas do CSV ou XLSX, todas as células como texto."""
+    if nome.lower().endswith(".xlsx"):
+        return _blocos_excel(arquivo)
+    if nome.lower().endswith(".csv"):
+        return _blocos_csv(arquivo)
+    raise ValueError(f"Formato de importação desconhecido: {nome}")
+
+
+def _validar_bloco(bloco, diretorio, anos_arquivados):
+    """Registros no formato da planilha e a lista de erros (vazia quando a linha é válida) de cada linha."""
+    bloco = bloco.reindex(columns=COLUNAS_IMPORTACAO, fill_value="").fillna("").astype(str)
+    bloco = bloco.apply(lambda c: c.str.strip())
+    erros = pd.Series([[] for _ in range(len(bloco))], index=bloco.index, dtype=object)
+
+    def marcar(invalidas, mensagem):
+        for i in invalidas[invalidas].index:
+            erros[i].append(mensagem)
+
+    datas = pd.to_datetime(bloco["Data"], format="%d/%m/%Y", errors="coerce")
+    marcar(datas.isna(), "Data inválida (use DD/MM/AAAA)")
+    marcar(datas.dt.year.isin(list(anos_arquivados)), "Ano já arquivado")
+
+    funcionarios = bloco["Funcionário"]
+    marcar(~funcionarios.map(diretorio.__contains__).astype(bool), "Funcionário não cadastrado")
+    marcar(~bloco["Líder"].isin(LISTA_LIDERES[1:]), "Líder fora da lista")
+    marcar(bloco["Tema"] == "", "Tema vazio")
+
+    partes = bloco["Horas"].str.extract(_HORAS).apply(pd.to_numeric).astype(float)
+    horas_validas = partes.notna().all(axis=1) & (partes[0] <= 23) & (partes[1] <= 59) & (partes[2] <= 59)
+    marcar(~horas_validas, "Horas inválidas (use H:M:S)")
+    horas = (partes[0] + partes[1] / 60 + partes[2] / 3600).where(horas_validas, 0.0)
+
+    notas = pd.to_numeric(bloco["Avaliação"].str.replace(",", "."), errors="coerce")
+    notas = notas.where(notas.isin(range(1, 11))).astype("Int64").astype("string")
+    marcar(~notas.isin(LISTA_NOTAS_VALIDAS).fillna(False).astype(bool), "Avaliação fora de 1 a 10")
+
+    registros = pd.DataFrame({
+        "ID": [novo_id() for _ in range(len(bloco))],
+        "Data": datas.dt.strftime("%d/%m/%Y"),
+        "Funcionário": funcionarios,
+        "Setor": funcionarios.map(lambda nome: getattr(diretorio.get(nome), "setor", None)),
+        "Líder": bloco["Líder"],
+        "Tema": bloco["Tema"],
+        "Horas": horas,
+        "Avaliação": notas,
+        "Nota_Lider": "-",
+        "Versao": 1,
+    }, index=bloco.index)
+    return registros, erros
+
+
+class ResultadoImportacao:
+    """Registros válidos, prontos para gravar em lotes, e o relatório de erros por linha."""
+
+    def __init__(self, registros, erros, linhas):
+        self.registros = registros
+        self.erros = erros
+        self.linhas = linhas
+
+    def lotes(self, tamanho=TAMANHO_LOTE):
+        for inicio in range(0, len(self.registros), tamanho):
+            yield self.registros.iloc[inicio:inicio + tamanho]
+
+
+def validar_importacao(arquivo, nome, diretorio, chaves_existentes=frozenset(), anos_arquivados=()):
+    """Lê ``arquivo`` em blocos e valida cada linha com as regras do cadastro de curso.
+
+    Cada linha precisa de Data (DD/MM/AAAA), Funcionário cadastrado em
+    ``diretorio``, Líder da lista, Tema, Horas em H:M:S e Avaliação de 1 a 10;
+    o Setor vem do cadastro do funcionário. Anos em ``anos_arquivados`` não
+    aceitam registros, e linhas cuja chave (``chaves_registros``) já está em
+    ``chaves_existentes`` ou se repete no próprio arquivo são rejeitadas como
+    duplicadas. As linhas do relatório de erros contam o cabeçalho como linha 1.
+    """
+    validos, erros, vistas, linhas = [], [], set(), 0
+    for bloco in ler_blocos(arquivo, nome):
+        bloco.columns = [str(c).strip() for c in bloco.columns]
+        faltando = [c for c in COLUNAS_IMPORTACAO if c not in bloco.columns]
+        if faltando:
+            raise ValueError(f"Colunas obrigatórias ausentes: {', '.join(faltando)}")
+        if bloco.empty:
+            continue
+        bloco.index = pd.RangeIndex(linhas + 2, linhas + 2 + len(bloco))
+        linhas += len(bloco)
+        registros, erros_bloco = _validar_bloco(bloco, diretorio, anos_arquivados)
+
+        sem_erro = erros_bloco.map(len) == 0
+        # Pertinência direto nos conjuntos: isin converteria as chaves existentes a cada bloco
+        chaves = chaves_registros(registros)
+        conhecidas = pd.Series([c in chaves_existentes or c in vistas for c in chaves.tolist()], index=chaves.index)
+        duplicadas = conhecidas | chaves.where(sem_erro).duplicated()
+        for i in duplicadas[duplicadas & sem_erro].index:
+            erros_bloco[i].append("Registro duplicado")
+        sem_erro &= ~duplicadas
+        vistas.update(chaves[sem_erro])
+
+        validos.append(registros[sem_erro])
+        com_erro = erros_bloco[~sem_erro]
+        erros.append(pd.DataFrame({"Linha": com_erro.index, "Erro": com_erro.map("; ".join).to_numpy()}))
+
+    registros = pd.concat(validos, ignore_index=True) if validos else pd.DataFrame()
+    erros = pd.concat(erros, ignore_index=True) if erros else pd.DataFrame(columns=["Linha", "Erro"])
+    return ResultadoImportacao(registros, erros, linhas)
+
+
+def relatorio_erros(resultado):
+    """CSV do relatório de erros, no mesmo formato do CSV exportado."""
+    saida = io.BytesIO()
+    resultado.erros.to_csv(saida, index=False, sep=";", encoding="utf-8-sig")
+    return saida.getvalue()
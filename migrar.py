@@ -0,0 +1,71 @@
+"""Copia as abas entre a planilha Google e o banco SQLite local.
+
+Uso:
+    python migrar.py importar        # planilha -> banco local
+    python migrar.py espelhar        # banco local -> planilha
+    python migrar.py arquivar [ANO]  # move anos encerrados para arquivos somente leitura
+    python migrar.py senhas          # troca as senhas em texto da aba Usuarios por hash
+
+O caminho do banco vem de ARMAZENAMENTO_SQLITE (padrão dados/treinamentos.db);
+``arquivar`` usa o backend de ARMAZENAMENTO e, sem ANO, arquiva todos os anos
+encerrados que ainda estão na aba Treinamentos. ``senhas`` também usa o backend
+de ARMAZENAMENTO, deve rodar uma vez antes de publicar a versão com login por
+hash (senhas em texto deixam de conferir) e pode ser repetido sem efeito.
+"""
+import sys
+from datetime import datetime
+
+from armazenamento import anos_dos_registros, arquivar_ano, criar_backend, garantir_ids
+from usuarios import migrar_senhas
+
+ABAS = ["Treinamentos", "Usuarios"]
+
+
+def copiar(origem, destino, abas=ABAS):
+    for aba in abas:
+        df = origem.ler(aba)
+        if df.empty:
+            print(f"{aba}: vazia, ignorada")
+            continue
+        df, _ = garantir_ids(df)
+        destino.escrever(aba, df)
+        print(f"{aba}: {len(df)} linhas copiadas")
+        for ano in origem.anos_arquivados(aba):
+            destino.gravar_arquivo(aba, ano, origem.ler_arquivo(aba, ano))
+            print(f"{aba} {ano}: arquivo copiado")
+
+
+def arquivar(backend, anos=None, aba="Treinamentos"):
+    if anos is None:
+        anos = sorted(int(a) for a in anos_dos_registros(backend.ler(aba)).dropna().unique() if a < datetime.now().year)
+    for ano in anos:
+        print(f"{aba} {ano}: {arquivar_ano(backend, aba, ano)} linhas arquivadas")
+
+
+def senhas(backend):
+    usuarios, trocadas = migrar_senhas(backend.ler("Usuarios"))
+    if trocadas:
+        backend.escrever("Usuarios", usuarios)
+    print(f"Usuarios: {trocadas} senhas convertidas em hash")
+
+
+def main(argv):
+    if len(argv) in (2, 3) and argv[1] == "arquivar":
+        arquivar(criar_backend(), [int(argv[2])] if len(argv) == 3 else None)
+        return 0
+    if argv[1:] == ["senhas"]:
+        senhas(criar_backend())
+        return 0
+    if len(argv) != 2 or argv[1] not in ("importar", "espelhar"):
+        print(__doc__)
+        return 1
+    planilha, local = criar_backend("gsheets"), criar_backend("sqlite")
+    if argv[1] == "importar":
+        copiar(planilha, local)
+    else:
+        copiar(local, planilha)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,44 @@
+import pandas as pd
+import pytest
+
+from analitico import MotorRelatorio
+from esquema import normalizar_treinamentos
+
+
+def _registros(*linhas):
+    return normalizar_treinamentos(pd.DataFrame(
+        [{"ID": i, "Data": data, "Funcionário": "Ana", "Setor": "Departamento Fiscal", "Líder": "Victor Souza",
+          "Tema": "Excel", "Horas": horas, "Avaliação": "8", "Nota_Lider": "-", "Versao": 1}
+         for i, (data, horas) in enumerate(linhas)]))
+
+
+@pytest.fixture
+def motor():
+    return MotorRelatorio()
+
+
+def test_filtros_de_periodo(motor):
+    tabela = motor.sincronizar("principal", 1, _registros(("05/03/2025", 2.0), ("10/04/2025", 3.0), ("01/01/2024", 1.0)))
+    assert motor.totais([tabela], ano=2025)[:2] == (2, 5.0)
+    assert motor.totais([tabela], ano=[2024, 2025], mes=3)[:2] == (1, 2.0)
+    assert motor.registros([tabela], ano=2025)["Horas"].tolist() == [2.0, 3.0]
+
+
+def test_nome_de_versao_descartada_consulta_a_mais_recente(motor):
+    # Como a exportação, que guarda o nome da tabela e só consulta no clique
+    antiga = motor.sincronizar("principal", 1, _registros(("05/03/2025", 2.0)))
+    motor.sincronizar("principal", 2, _registros(("05/03/2025", 2.0), ("06/03/2025", 1.0)))
+    motor.sincronizar("principal", 3, _registros(("05/03/2025", 2.0), ("06/03/2025", 1.0), ("07/03/2025", 4.0)))
+    assert motor.totais([antiga])[:2] == (3, 7.0)
+    assert len(motor.registros([antiga])) == 3
+
+
+def test_tabela_em_uso_nao_e_apagada(motor):
+    antiga = motor.sincronizar("principal", 1, _registros(("05/03/2025", 2.0)))
+    reservadas = motor._reservar([antiga])
+    motor.sincronizar("principal", 2, _registros(("05/03/2025", 2.0)))
+    motor.sincronizar("principal", 3, _registros(("05/03/2025", 2.0)))
+    assert len(motor._con.execute(f"SELECT * FROM {antiga}").fetchall()) == 1
+
+    motor._liberar(reservadas)
+    assert antiga not in motor._con.execute("SELECT table_name FROM duckdb_tables()").df()["table_name"].tolist()
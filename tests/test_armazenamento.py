@@ -0,0 +1,115 @@
+import pandas as pd
+import pytest
+from gspread.utils import a1_to_rowcol
+
+from armazenamento import BackendGSheets, BackendSQLite, ConflitoEdicao
+
+
+class PlanilhaFalsa:
+    """Aba em memória com as chamadas do gspread usadas pelo backend."""
+
+    def __init__(self, linhas):
+        self.linhas = [list(linha) for linha in linhas]
+
+    def row_values(self, linha):
+        return list(self.linhas[linha - 1]) if linha <= len(self.linhas) else []
+
+    def batch_get(self, intervalos, **kwargs):
+        resultado = []
+        for intervalo in intervalos:
+            inicio, fim = intervalo.split(":")
+            if inicio.isdigit():
+                resultado.append([self.row_values(int(inicio))])
+                continue
+            linha, coluna = a1_to_rowcol(inicio)
+            ultima_linha, ultima_coluna = a1_to_rowcol(fim) if fim[-1].isdigit() else (len(self.linhas), a1_to_rowcol(fim + "1")[1])
+            resultado.append([l[coluna - 1:ultima_coluna] for l in self.linhas[linha - 1:ultima_linha]])
+        return resultado
+
+    def batch_update(self, dados, **kwargs):
+        for dado in dados:
+            linha, coluna = a1_to_rowcol(dado["range"])
+            self.linhas[linha - 1][coluna - 1] = dado["values"][0][0]
+
+    def append_row(self, linha, **kwargs):
+        self.linhas.append(list(linha))
+
+    def append_rows(self, linhas, **kwargs):
+        self.linhas.extend(list(linha) for linha in linhas)
+
+    def delete_rows(self, linha):
+        del self.linhas[linha - 1]
+
+
+class ConexaoFalsa:
+    def __init__(self, planilha):
+        self.client = self
+        self.planilha = planilha
+
+    def _select_worksheet(self, worksheet=None):
+        return self.planilha
+
+
+@pytest.fixture
+def planilha():
+    return PlanilhaFalsa([["ID", "Tema", "Versao"], ["a", "Excel", "1"], ["b", "SPED", "2"]])
+
+
+def test_update_row_localiza_pelo_id_e_soma_versao(planilha):
+    backend = BackendGSheets(ConexaoFalsa(planilha))
+    backend.update_row("T", "b", {"Tema": "IRPF"}, versao_esperada=2)
+    assert planilha.linhas[2] == ["b", "IRPF", 3]
+
+
+def test_versao_diferente_gera_conflito(planilha):
+    backend = BackendGSheets(ConexaoFalsa(planilha))
+    with pytest.raises(ConflitoEdicao):
+        backend.update_row("T", "a", {"Tema": "IRPF"}, versao_esperada=5)
+    with pytest.raises(ConflitoEdicao):
+        backend.delete_row("T", "zz")
+
+
+def test_coluna_inserida_a_mao_nao_desloca_gravacoes(planilha):
+    backend = BackendGSheets(ConexaoFalsa(planilha))
+    backend.update_row("T", "a", {"Tema": "Git"})
+
+    # Alguém insere uma coluna antes de Tema direto na planilha
+    for linha, valor in zip(planilha.linhas, ["Setor", "Fiscal", "RH"]):
+        linha.insert(1, valor)
+    backend.update_row("T", "b", {"Tema": "IRPF"}, versao_esperada=2)
+    backend.append_rows("T", pd.DataFrame([{"ID": "c", "Tema": "Python", "Versao": 1}]))
+    backend.delete_row("T", "a", versao_esperada=2)
+
+    assert planilha.linhas == [["ID", "Setor", "Tema", "Versao"], ["b", "RH", "IRPF", 3], ["c", "", "Python", 1]]
+
+
+def test_ler_alteracoes_acompanha_colunas_reordenadas(planilha):
+    backend = BackendGSheets(ConexaoFalsa(planilha))
+    versoes = pd.Series({"a": 1, "b": 2})
+    assert backend.ler_alteracoes("T", versoes)[0].empty
+
+    planilha.linhas = [[linha[2], linha[1], linha[0]] for linha in planilha.linhas]
+    planilha.linhas[1][0] = "4"
+    alterados, removidos = backend.ler_alteracoes("T", versoes)
+    assert alterados[["ID", "Tema", "Versao"]].values.tolist() == [["a", "Excel", 4]]
+    assert removidos == []
+
+
+def test_sqlite_guarda_senha_numerica_como_texto(tmp_path):
+    backend = BackendSQLite(str(tmp_path / "dados.db"))
+    # Como a planilha devolve uma coluna só de números, com e sem vazios
+    backend.escrever("Usuarios", pd.DataFrame({"ID": ["a", "b"], "usuario": ["Ana", "Bruno"], "senha": [123456, 654321],
+                                               "Versao": [1, 1]}))
+    backend.append_rows("Usuarios", pd.DataFrame({"ID": ["c"], "usuario": ["Carla"], "senha": [111.0], "Versao": [1]}))
+    backend.update_row("Usuarios", "b", {"senha": 999999.0})
+    assert backend.ler("Usuarios")["senha"].tolist() == ["123456", "999999", "111"]
+
+
+def test_sqlite_mantem_horas_e_versao_numericas(tmp_path):
+    backend = BackendSQLite(str(tmp_path / "dados.db"))
+    backend.escrever("Treinamentos", pd.DataFrame({"ID": ["a"], "Data": ["05/03/2025"], "Horas": [2.5], "Avaliação": [8.0],
+                                                   "Nota_Lider": [None], "Versao": [1]}))
+    backend.update_row("Treinamentos", "a", {"Horas": 3})
+    df = backend.ler("Treinamentos")
+    assert df.loc[0, ["Data", "Horas", "Avaliação", "Versao"]].tolist() == ["05/03/2025", 3.0, "8", 2]
+    assert df["Nota_Lider"].isna().all()
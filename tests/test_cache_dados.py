@@ -0,0 +1,92 @@
+import pandas as pd
+
+from cache_dados import SnapshotCache
+
+
+class Carga:
+    """Função de carga que conta as chamadas e devolve um DataFrame novo a cada uma."""
+
+    def __init__(self, durante=None):
+        self.chamadas = 0
+        self.durante = durante
+
+    def __call__(self):
+        self.chamadas += 1
+        if self.durante is not None:
+            self.durante()
+        return pd.DataFrame({"n": [self.chamadas]})
+
+
+def test_reaproveita_o_snapshot_dentro_do_ttl():
+    cache, carga = SnapshotCache(ttl_segundos=60), Carga()
+    primeiro = cache.obter("T", carga)
+    assert cache.obter("T", carga) is primeiro
+    assert carga.chamadas == 1
+    assert (primeiro.versao, cache.versao("T")) == (1, 1)
+
+
+def test_ttl_vencido_le_de_novo():
+    cache, carga = SnapshotCache(ttl_segundos=0), Carga()
+    primeiro, segundo = cache.obter("T", carga), cache.obter("T", carga)
+    assert carga.chamadas == 2
+    assert segundo.versao == primeiro.versao + 1
+    # TTL próprio da aba (dados imutáveis) vale mais que o padrão
+    assert cache.obter("A", carga, ttl=float("inf")) is cache.obter("A", carga, ttl=float("inf"))
+
+
+def test_leitura_que_cruza_uma_gravacao_nao_vira_o_snapshot_atual():
+    cache = SnapshotCache(ttl_segundos=60)
+    carga = Carga(durante=lambda: cache.invalidar("T"))
+    lido = cache.obter("T", carga)
+    assert lido.df["n"].tolist() == [1]
+    assert cache.atual("T") is None
+
+    carga.durante = None
+    assert cache.obter("T", carga).df["n"].tolist() == [2]
+    assert cache.atual("T") is not None
+
+
+def test_publicar_troca_so_a_versao_base():
+    cache = SnapshotCache(ttl_segundos=60)
+    base = cache.obter("T", Carga())
+    cache.publicar("T", base, pd.DataFrame({"n": [10]}))
+    publicado = cache.atual("T")
+    assert (publicado.df["n"].tolist(), publicado.versao) == ([10], 2)
+    assert publicado.lido_em == base.lido_em
+
+    # Gravação feita sobre um snapshot que já foi substituído: só invalida
+    cache.publicar("T", base, pd.DataFrame({"n": [20]}))
+    assert cache.atual("T") is None
+    assert cache.versao("T") == 3
+
+
+def test_derivado_calculado_uma_vez_por_versao():
+    cache = SnapshotCache(ttl_segundos=60)
+    calculos = []
+
+    def total(df):
+        calculos.append(len(calculos))
+        return int(df["n"].sum())
+
+    base = cache.obter("T", Carga())
+    assert base.derivado("total", total) == 1
+    assert cache.obter("T", Carga()).derivado("total", total) == 1
+    assert len(calculos) == 1
+
+    cache.publicar("T", base, pd.DataFrame({"n": [5, 6]}))
+    assert cache.atual("T").derivado("total", total) == 11
+    assert len(calculos) == 2
+
+    # Derivados publicados junto com a gravação não são recalculados
+    atual = cache.atual("T")
+    cache.publicar("T", atual, pd.DataFrame({"n": [1]}), {"total": 99})
+    assert cache.atual("T").derivado("total", total) == 99
+    assert len(calculos) == 2
+
+
+def test_atualizacao_parcial_mantem_snapshot_sem_mudancas():
+    cache, carga = SnapshotCache(ttl_segundos=0), Carga()
+    base = cache.obter("T", carga)
+    assert cache.obter("T", carga, atualizar=lambda snap: (snap.df, {})) is base
+    novo = cache.obter("T", carga, atualizar=lambda snap: (pd.DataFrame({"n": [7]}), {"total": 7}))
+    assert (novo.versao, novo.derivado("total", None), carga.chamadas) == (2, 7, 1)
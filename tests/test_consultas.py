@@ -0,0 +1,12 @@
+import pandas as pd
+
+from consultas import funcionarios_da_equipe, pares_setor_funcionario
+
+
+def test_equipe_junta_as_particoes_e_filtra_por_setor():
+    atual = pd.DataFrame({"Setor": ["Fiscal", "Fiscal", "RH"], "Funcionário": ["Ana", "Ana", "Carla"]})
+    arquivado = pd.DataFrame({"Setor": ["Fiscal", None], "Funcionário": ["Bruno", "Zé"]})
+    pares = pares_setor_funcionario(atual) | pares_setor_funcionario(arquivado)
+    assert funcionarios_da_equipe(pares, "Fiscal") == ["Ana", "Bruno"]
+    assert funcionarios_da_equipe(pares) == ["Ana", "Bruno", "Carla"]
+    assert funcionarios_da_equipe(frozenset(), "Fiscal") == []
@@ -0,0 +1,260 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+from armazenamento import BackendSQLite, ConflitoEdicao
+from fila_gravacao import FilaGravacao, coalescer
+
+
+class CotaExcedida(Exception):
+    """Como o erro do gspread quando a API responde 429."""
+
+    def __init__(self):
+        super().__init__("429 Quota exceeded")
+        self.response = SimpleNamespace(status_code=429)
+
+
+class BackendFalso:
+    """Abas em memória com latência por chamada e erros injetados na ordem em que devem ocorrer."""
+
+    def __init__(self, latencia=0.0, erros=()):
+        self.abas = {}
+        self.latencia = latencia
+        self.erros = list(erros)
+        self.chamadas = []
+        self._lock = threading.Lock()
+
+    def _chamar(self, metodo):
+        with self._lock:
+            self.chamadas.append(metodo)
+            erro = self.erros.pop(0) if self.erros else None
+        time.sleep(self.latencia)
+        if erro is not None:
+            raise erro
+
+    def metodos(self, metodo):
+        return [m for m in self.chamadas if m == metodo]
+
+    def ler(self, aba):
+        self._chamar("ler")
+        return self.abas.get(aba, pd.DataFrame()).copy()
+
+    def escrever(self, aba, df):
+        self._chamar("escrever")
+        self.abas[aba] = df.reset_index(drop=True)
+
+    def append_rows(self, aba, df):
+        self._chamar("append_rows")
+        self.abas[aba] = pd.concat([self.abas.get(aba, pd.DataFrame()), df], ignore_index=True)
+
+    def _linha(self, aba, id_registro, versao_esperada):
+        df = self.abas[aba]
+        alvo = df["ID"] == id_registro
+        if not alvo.any():
+            raise ConflitoEdicao("O registro foi excluído por outro usuário.")
+        if versao_esperada is not None and int(df.loc[alvo, "Versao"].iloc[0]) != int(versao_esperada):
+            raise ConflitoEdicao("O registro foi alterado por outro usuário. Recarregue e tente novamente.")
+        return alvo
+
+    def update_row(self, aba, id_registro, campos, versao_esperada=None, incremento=1):
+        self._chamar("update_row")
+        alvo = self._linha(aba, id_registro, versao_esperada)
+        for col, valor in campos.items():
+            self.abas[aba].loc[alvo, col] = valor
+        self.abas[aba].loc[alvo, "Versao"] += incremento
+
+    def delete_row(self, aba, id_registro, versao_esperada=None):
+        self._chamar("delete_row")
+        alvo = self._linha(aba, id_registro, versao_esperada)
+        self.abas[aba] = self.abas[aba][~alvo].reset_index(drop=True)
+
+
+def _linhas(*ids):
+    return pd.DataFrame([{"ID": i, "Tema": f"Tema {i}", "Versao": 1} for i in ids])
+
+
+@pytest.fixture
+def criar_fila(tmp_path):
+    def criar(backend, **kwargs):
+        opcoes = dict(janela_segundos=0.05, espera_inicial=0.01, espera_maxima=0.05)
+        return FilaGravacao(backend, str(tmp_path / "fila.jsonl"), **dict(opcoes, **kwargs))
+    return criar
+
+
+# --- COALESCÊNCIA ---
+def test_coalescer_junta_insercoes_e_aplica_edicoes_nas_linhas_nao_enviadas():
+    operacoes = [
+        {"tipo": "append", "aba": "T", "linhas": [{"ID": "a", "Tema": "x", "Versao": 1}], "origens": ["Ana"]},
+        {"tipo": "append", "aba": "T", "linhas": [{"ID": "b", "Tema": "y", "Versao": 1}], "origens": ["Bruno"]},
+        {"tipo": "update", "aba": "T", "id": "a", "campos": {"Tema": "z"}, "versao": 1, "incremento": 1, "origens": ["Ana"]},
+        {"tipo": "delete", "aba": "T", "id": "b", "versao": 1, "origens": ["Bruno"]},
+        {"tipo": "append", "aba": "U", "linhas": [{"ID": "c", "Versao": 1}], "origens": []},
+    ]
+    assert coalescer(operacoes) == [
+        {"tipo": "append", "aba": "T", "linhas": [{"ID": "a", "Tema": "z", "Versao": 2}], "origens": ["Ana"],
+         "verificar": False},
+        {"tipo": "append", "aba": "U", "linhas": [{"ID": "c", "Versao": 1}], "origens": [], "verificar": False},
+    ]
+
+
+def test_coalescer_soma_edicoes_seguidas_do_mesmo_registro():
+    operacoes = [
+        {"tipo": "update", "aba": "T", "id": "a", "campos": {"Tema": "x"}, "versao": 3, "incremento": 1, "origens": ["Ana"]},
+        {"tipo": "update", "aba": "T", "id": "a", "campos": {"Horas": 2}, "versao": 4, "incremento": 1, "origens": ["Bruno"]},
+        {"tipo": "update", "aba": "T", "id": "b", "campos": {"Tema": "y"}, "versao": 1, "incremento": 1, "origens": []},
+    ]
+    somadas = coalescer(operacoes)
+    assert len(somadas) == 2
+    assert somadas[0]["campos"] == {"Tema": "x", "Horas": 2}
+    assert (somadas[0]["versao"], somadas[0]["incremento"], somadas[0]["origens"]) == (3, 2, ["Ana", "Bruno"])
+
+
+def test_coalescer_mantem_separada_edicao_com_versao_fora_de_sequencia():
+    operacoes = [
+        {"tipo": "update", "aba": "T", "id": "a", "campos": {"Tema": "x"}, "versao": 3, "incremento": 1, "origens": []},
+        {"tipo": "update", "aba": "T", "id": "a", "campos": {"Tema": "y"}, "versao": 3, "incremento": 1, "origens": []},
+    ]
+    assert len(coalescer(operacoes)) == 2
+
+
+def test_escrita_completa_descarta_operacoes_anteriores():
+    operacoes = [
+        {"tipo": "append", "aba": "T", "linhas": [{"ID": "a"}], "origens": []},
+        {"tipo": "escrever", "aba": "T", "linhas": [{"ID": "b"}], "origens": []},
+    ]
+    assert coalescer(operacoes) == [operacoes[1]]
+
+
+# --- ENVIO ---
+def test_leitura_ve_gravacoes_ainda_na_fila(criar_fila):
+    backend = BackendFalso(latencia=0.01)
+    fila = criar_fila(backend, janela_segundos=0.5)
+    fila.append_rows("T", _linhas("a", "b"))
+    assert fila.ler("T")["ID"].tolist() == ["a", "b"]
+    assert "append_rows" not in backend.chamadas
+    assert fila.aguardar(5)
+    assert backend.abas["T"]["ID"].tolist() == ["a", "b"]
+
+
+def test_gravacoes_do_mesmo_momento_viram_uma_chamada(criar_fila):
+    backend = BackendFalso(latencia=0.01)
+    fila = criar_fila(backend, janela_segundos=0.2)
+    for i in range(5):
+        fila.append_rows("T", _linhas(str(i)))
+    fila.update_row("T", "3", {"Tema": "Editado"}, 1)
+    assert fila.aguardar(5)
+    assert backend.metodos("append_rows") == ["append_rows"]
+    assert backend.abas["T"].set_index("ID").loc["3", ["Tema", "Versao"]].tolist() == ["Editado", 2]
+
+
+def test_cota_excedida_repete_com_espera(criar_fila):
+    backend = BackendFalso(latencia=0.01, erros=[CotaExcedida(), CotaExcedida()])
+    fila = criar_fila(backend)
+    fila.append_rows("T", _linhas("a"), origem="Ana")
+    assert fila.aguardar(5)
+    # Depois de uma falha, a inserção confere os IDs já gravados antes de reenviar
+    assert backend.chamadas == ["append_rows", "ler", "ler", "append_rows"]
+    assert backend.abas["T"]["ID"].tolist() == ["a"]
+    assert fila.falhas_de("Ana") == []
+
+
+def test_tentativas_esgotadas_falham_a_operacao_e_liberam_a_fila(criar_fila):
+    backend = BackendFalso(erros=[CotaExcedida()] * 3)
+    falhas = []
+    fila = criar_fila(backend, max_tentativas=3, ao_falhar=lambda op, erro: falhas.append(op["tipo"]))
+    backend.abas["T"] = _linhas("a", "b")
+    fila.update_row("T", "a", {"Tema": "x"}, 1, origem="Ana")
+    time.sleep(0.1)
+    fila.update_row("T", "b", {"Tema": "y"}, 1, origem="Bruno")
+    assert fila.aguardar(5)
+    assert [f["erro"] for f in fila.falhas_de("Ana")] == ["429 Quota exceeded"]
+    assert falhas == ["update"]
+    assert backend.abas["T"]["Tema"].tolist() == ["Tema a", "y"]
+
+
+def test_conflito_de_versao_vai_para_as_falhas_de_quem_gravou(criar_fila):
+    backend = BackendFalso()
+    backend.abas["T"] = _linhas("a")
+    fila = criar_fila(backend)
+    fila.update_row("T", "a", {"Tema": "x"}, versao_esperada=7, origem="Ana")
+    fila.delete_row("T", "zz", origem="Bruno")
+    assert fila.aguardar(5)
+    assert backend.metodos("update_row") == ["update_row"]
+    assert [f["tipo"] for f in fila.falhas_de("Ana")] == ["update"]
+    assert [f["tipo"] for f in fila.falhas_de("Bruno")] == ["delete"]
+    assert fila.falhas_de("Ana") == []
+
+
+def test_erro_permanente_do_sqlite_nao_trava_as_gravacoes_seguintes(criar_fila, tmp_path):
+    backend = BackendSQLite(str(tmp_path / "dados.db"))
+    backend.escrever("T", _linhas("a"))
+    fila = criar_fila(backend)
+    fila.update_row("T", "a", {"y": 2}, origem="Ana")
+    fila.update_row("T", "a", {"Tema": "Novo"}, origem="Ana")
+    assert fila.aguardar(5)
+    assert "no such column" in fila.falhas_de("Ana")[0]["erro"]
+    assert backend.ler("T")["Tema"].tolist() == ["Novo"]
+
+
+def test_erro_da_propria_fila_nao_mata_a_thread(criar_fila):
+    backend = BackendFalso()
+    fila = criar_fila(backend)
+    regravar = fila._regravar_diario
+    erros = [OSError("No space left on device")]
+
+    def regravar_sem_espaco():
+        if erros:
+            raise erros.pop()
+        regravar()
+    fila._regravar_diario = regravar_sem_espaco
+
+    fila.append_rows("T", _linhas("a"))
+    assert fila.aguardar(5)
+    fila.append_rows("T", _linhas("b"))
+    assert fila.aguardar(5)
+    assert backend.abas["T"]["ID"].tolist() == ["a", "b"]
+
+
+# --- DIÁRIO ---
+def test_diario_e_reenviado_depois_de_reiniciar(criar_fila):
+    # Processo que cai antes de conseguir enviar: a planilha só responde 429
+    fora_do_ar = BackendFalso(erros=[CotaExcedida()] * 100)
+    fila = criar_fila(fora_do_ar, espera_inicial=60, espera_maxima=60)
+    fila.append_rows("T", _linhas("a", "b"))
+    fila.update_row("X", "c", {"Tema": "y"})
+    time.sleep(0.2)
+
+    # A linha "a" chegou à planilha antes da queda; só "b" pode ser enviada de novo
+    backend = BackendFalso()
+    backend.abas["T"] = _linhas("a")
+    backend.abas["X"] = _linhas("c")
+    reiniciada = criar_fila(backend)
+    assert reiniciada.aguardar(5)
+    assert backend.abas["T"]["ID"].tolist() == ["a", "b"]
+    assert backend.abas["X"]["Tema"].tolist() == ["y"]
+    assert reiniciada.pendentes() == 0
+
+
+def test_coalescer_limita_linhas_por_append():
+    operacoes = [{"tipo": "append", "aba": "T", "linhas": [{"ID": f"{lote}-{i}"} for i in range(4)], "origens": [f"lote{lote}"]}
+                 for lote in range(3)]
+    operacoes[1]["verificar"] = True
+    lotes = coalescer(operacoes, linhas_por_append=5)
+    assert [len(op["linhas"]) for op in lotes] == [5, 5, 2]
+    assert [op["linhas"][0]["ID"] for op in lotes] == ["0-0", "1-1", "2-2"]
+    assert [op["origens"] for op in lotes] == [["lote0", "lote1"], ["lote1", "lote2"], ["lote2"]]
+    assert [op["verificar"] for op in lotes] == [True, True, False]
+
+
+def test_importacao_grande_vai_em_varios_appends(criar_fila):
+    backend = BackendFalso(erros=[None, CotaExcedida()])
+    fila = criar_fila(backend, janela_segundos=0.2)
+    for inicio in range(0, 5000, 1000):
+        fila.append_rows("T", _linhas(*(str(i) for i in range(inicio, inicio + 1000))))
+    assert fila.aguardar(5)
+    # Só o segundo lote falhou e foi reenviado, depois de conferir o que já estava gravado
+    assert backend.chamadas == ["append_rows", "append_rows", "ler", "append_rows", "append_rows"]
+    assert backend.abas["T"]["ID"].tolist() == [str(i) for i in range(5000)]
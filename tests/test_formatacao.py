@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from formatacao import formatar_horas, notas_para_int, notas_para_texto
+
+
+def format_to_time(decimal_hours):
+    # Cópia da versão escalar do app.py, que é a referência do formato
+    hours = int(decimal_hours)
+    minutes = int((decimal_hours - hours) * 60)
+    seconds = int(round(((decimal_hours - hours) * 60 - minutes) * 60))
+    if seconds == 60: seconds = 0; minutes += 1
+    if minutes == 60: minutes = 0; hours += 1
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+
+
+@pytest.mark.parametrize("horas, esperado", [
+    (0, "00:00:00"),
+    (2.5, "02:30:00"),
+    (1.25, "01:15:00"),
+    (0.7583333333333333, "00:45:30"),
+    (123.5, "123:30:00"),
+    # Segundos arredondados para 60 transportam para minutos, e 60 minutos para horas
+    (1 + 59 / 60 + 59.6 / 3600, "02:00:00"),
+    (0.9999999, "01:00:00"),
+    (3 + 14 / 60 + 59.7 / 3600, "03:15:00"),
+])
+def test_formatar_horas(horas, esperado):
+    assert formatar_horas(pd.Series([horas])).tolist() == [esperado]
+
+
+def test_formatar_horas_arredonda_meio_para_o_par():
+    # Segundos com fração .5 exata: round() do Python e np.round vão para o par
+    horas = pd.Series([s / 3600 for s in (0.5, 1.5, 2.5, 3.5)] + [1 + 59 / 60 + 59.5 / 3600])
+    assert formatar_horas(horas).tolist() == [format_to_time(h) for h in horas]
+
+
+def test_formatar_horas_igual_a_versao_escalar():
+    rng = np.random.default_rng(0)
+    horas = pd.Series(np.concatenate([
+        rng.uniform(0, 40, 100000),
+        rng.integers(0, 40 * 3600, 100000) / 3600,
+        np.round(rng.uniform(0, 10, 10000), 2),
+    ]), index=np.arange(210000) * 2)
+    formatadas = formatar_horas(horas)
+    assert formatadas.index.equals(horas.index)
+    assert formatadas.tolist() == [format_to_time(h) for h in horas]
+
+
+def test_formatar_horas_aceita_array():
+    assert formatar_horas(np.array([1.5, 0.25])).tolist() == ["01:30:00", "00:15:00"]
+
+
+def test_notas_para_int():
+    notas = notas_para_int(pd.Series(["7", "7.0", 7.0, 10, "1", "-", "", np.nan, None, "0", "11", "7.5", "abc"],
+                                     dtype=object))
+    assert str(notas.dtype) == "Int8"
+    assert notas.tolist() == [7, 7, 7, 10, 1] + [pd.NA] * 8
+
+
+def test_notas_para_texto():
+    notas = notas_para_int(pd.Series(["7.0", "-", "", np.nan, "12"], dtype=object))
+    assert notas_para_texto(notas).tolist() == ["7", "-", "-", "-", "-"]
+    assert notas_para_texto(notas, vazio="").tolist() == ["7", "", "", "", ""]
@@ -0,0 +1,150 @@
+import io
+from datetime import datetime, time, timedelta
+
+import pandas as pd
+import pytest
+
+from importacao import COLUNAS_IMPORTACAO, chaves_registros, relatorio_erros, validar_importacao
+from usuarios import Diretorio
+
+DIRETORIO = Diretorio(pd.DataFrame({
+    "usuario": ["Ana", "Bruno"],
+    "senha": ["-", "-"],
+    "perfil": ["['Comum']", "['Comum']"],
+    "setor": ["RH", "TI"],
+}))
+CABECALHO = ";".join(COLUNAS_IMPORTACAO)
+
+
+def _csv(*linhas):
+    return io.BytesIO("\n".join([CABECALHO, *linhas]).encode("utf-8"))
+
+
+def _validar(*linhas, **kwargs):
+    return validar_importacao(_csv(*linhas), "importacao.csv", DIRETORIO, **kwargs)
+
+
+def _erros(resultado):
+    return dict(zip(resultado.erros["Linha"], resultado.erros["Erro"]))
+
+
+def test_linha_valida_vira_registro_da_planilha():
+    resultado = _validar("05/03/2025;Ana;Victor Souza;NR-10;1:30:00;9")
+    assert (resultado.linhas, len(resultado.erros)) == (1, 0)
+    registro = resultado.registros.iloc[0]
+    assert registro["Setor"] == "RH"
+    assert registro["Horas"] == 1.5
+    assert (registro["Avaliação"], registro["Nota_Lider"], registro["Versao"]) == ("9", "-", 1)
+
+
+def test_regras_do_cadastro_de_curso():
+    resultado = _validar(
+        "05/03/2025;Carla;Victor Souza;NR-10;1:00:00;9",
+        "05/03/2025;Ana;Selecione o Líder...;NR-10;1:00:00;9",
+        "05/03/2025;Ana;Victor Souza;;1:00:00;9",
+        "05/03/2025;Ana;Victor Souza;NR-10;1:75:00;9",
+        "05/03/2025;Ana;Victor Souza;NR-10;1:00:00;11",
+        "05/03/2025;Ana;Victor Souza;NR-10;2:00:00;8,0",
+    )
+    assert _erros(resultado) == {
+        2: "Funcionário não cadastrado",
+        3: "Líder fora da lista",
+        4: "Tema vazio",
+        5: "Horas inválidas (use H:M:S)",
+        6: "Avaliação fora de 1 a 10",
+    }
+    assert resultado.registros["Avaliação"].tolist() == ["8"]
+
+
+@pytest.mark.parametrize("data", ["31/02/2025", "2025-03-05", ""])
+def test_data_invalida(data):
+    resultado = _validar(f"{data};Ana;Victor Souza;NR-10;1:00:00;9")
+    assert _erros(resultado) == {2: "Data inválida (use DD/MM/AAAA)"}
+
+
+def test_ano_arquivado_nao_aceita_registros():
+    resultado = _validar("05/03/2023;Ana;Victor Souza;NR-10;1:00:00;9",
+                         "05/03/2025;Ana;Victor Souza;NR-10;1:00:00;9", anos_arquivados={2023})
+    assert _erros(resultado) == {2: "Ano já arquivado"}
+    assert len(resultado.registros) == 1
+
+
+def test_duplicados_no_arquivo_e_na_planilha():
+    existentes = pd.DataFrame({"Data": pd.to_datetime(["10/03/2025"], dayfirst=True), "Funcionário": ["Bruno"],
+                               "Tema": ["Excel"], "Horas": [2.0]})
+    resultado = _validar(
+        "05/03/2025;Ana;Victor Souza;NR-10;1:00:00;9",
+        "05/03/2025;Ana;Thiago Ferreira; nr-10 ;1:00:00;7",
+        "05/03/2025;Ana;Victor Souza;NR-10;2:00:00;9",
+        "10/03/2025;Bruno;Victor Souza;EXCEL;2:00:00;9",
+        chaves_existentes=frozenset(chaves_registros(existentes)),
+    )
+    assert _erros(resultado) == {3: "Registro duplicado", 5: "Registro duplicado"}
+    assert resultado.registros["Horas"].tolist() == [1.0, 2.0]
+
+
+def test_duplicados_entre_blocos(monkeypatch):
+    monkeypatch.setattr("importacao.TAMANHO_BLOCO", 1)
+    resultado = _validar("05/03/2025;Ana;Victor Souza;NR-10;1:00:00;9",
+                         "05/03/2025;Ana;Victor Souza;NR-10;1:00:00;9")
+    assert _erros(resultado) == {3: "Registro duplicado"}
+
+
+def test_csv_separado_por_virgula():
+    arquivo = io.BytesIO(("\ufeff" + ",".join(COLUNAS_IMPORTACAO) + "\n05/03/2025,Ana,Victor Souza,NR-10,1:00:00,9")
+                         .encode("utf-8"))
+    assert len(validar_importacao(arquivo, "importacao.csv", DIRETORIO).registros) == 1
+
+
+def test_arquivo_so_com_cabecalho():
+    resultado = _validar()
+    assert (resultado.linhas, len(resultado.registros), len(resultado.erros)) == (0, 0, 0)
+    assert list(resultado.lotes()) == []
+
+
+def test_arquivo_vazio_ou_sem_colunas():
+    with pytest.raises(ValueError, match="Colunas obrigatórias ausentes"):
+        validar_importacao(io.BytesIO(b""), "importacao.csv", DIRETORIO)
+    with pytest.raises(ValueError, match="Tema, Horas, Avaliação"):
+        validar_importacao(io.BytesIO(b"Data;Funcionario;Lider\n"), "importacao.csv", DIRETORIO)
+    with pytest.raises(ValueError, match="Formato"):
+        validar_importacao(io.BytesIO(b""), "importacao.txt", DIRETORIO)
+
+
+def _xlsx(*linhas):
+    from openpyxl import Workbook
+
+    wb = Workbook()
+    wb.active.append(COLUNAS_IMPORTACAO)
+    for linha in linhas:
+        wb.active.append(linha)
+    saida = io.BytesIO()
+    wb.save(saida)
+    saida.seek(0)
+    return saida
+
+
+def test_xlsx_com_celulas_de_data_e_horario():
+    arquivo = _xlsx(
+        [datetime(2025, 3, 5), "Ana", "Victor Souza", "NR-10", time(1, 30), 9],
+        [None, None, None, None, None, None],
+        ["06/03/2025", "Bruno", "Rafael Pires", "Excel", timedelta(hours=2, minutes=15), 8.0],
+    )
+    resultado = validar_importacao(arquivo, "importacao.xlsx", DIRETORIO)
+    assert (resultado.linhas, len(resultado.erros)) == (2, 0)
+    assert resultado.registros["Data"].tolist() == ["05/03/2025", "06/03/2025"]
+    assert resultado.registros["Horas"].tolist() == [1.5, 2.25]
+    assert resultado.registros["Avaliação"].tolist() == ["9", "8"]
+
+
+def test_xlsx_so_com_cabecalho_e_arquivo_invalido():
+    resultado = validar_importacao(_xlsx(), "importacao.xlsx", DIRETORIO)
+    assert (resultado.linhas, len(resultado.registros)) == (0, 0)
+    with pytest.raises(ValueError, match="Excel inválido"):
+        validar_importacao(io.BytesIO(b"nao e xlsx"), "importacao.xlsx", DIRETORIO)
+
+
+def test_relatorio_de_erros_em_csv():
+    resultado = _validar("05/03/2025;Carla;Victor Souza;NR-10;1:00:00;9")
+    relatorio = pd.read_csv(io.BytesIO(relatorio_erros(resultado)), sep=";", encoding="utf-8-sig")
+    assert relatorio.to_dict("records") == [{"Linha": 2, "Erro": "Funcionário não cadastrado"}]
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+
+import usuarios
+from usuarios import Diretorio, conferir_senha, eh_hash, gerar_hash, migrar_senhas
+
+# Poucas iterações: o custo do PBKDF2 não é o que está em teste
+ITERACOES = 1000
+
+
+def _usuarios(senhas, versoes=None):
+    return pd.DataFrame({
+        "ID": [f"U{i}" for i in range(len(senhas))],
+        "usuario": [f"u{i}" for i in range(len(senhas))],
+        "senha": senhas,
+        "perfil": ["['Gestor']"] * len(senhas),
+        "setor": ["RH"] * len(senhas),
+        "Versao": versoes or [1] * len(senhas),
+    })
+
+
+def test_hash_confere_so_com_a_senha_certa():
+    armazenada = gerar_hash("segredo", ITERACOES)
+    assert eh_hash(armazenada)
+    assert conferir_senha("segredo", armazenada)
+    assert not conferir_senha("Segredo", armazenada)
+    # Sal novo a cada hash
+    assert gerar_hash("segredo", ITERACOES) != armazenada
+
+
+def test_senha_em_texto_puro_nunca_confere():
+    assert not conferir_senha("123", "123")
+    assert Diretorio(_usuarios(["123"])).autenticar("u0", "123") is None
+
+
+def test_usuario_desconhecido_confere_contra_o_hash_ficticio(monkeypatch):
+    conferidas = []
+    original = usuarios.conferir_senha
+    monkeypatch.setattr(usuarios, "conferir_senha", lambda s, a: conferidas.append(a) or original(s, a))
+    diretorio = Diretorio(_usuarios([gerar_hash("123", ITERACOES)]))
+    assert diretorio.autenticar("ninguem", "123") is None
+    assert conferidas == [usuarios._HASH_FICTICIO]
+    assert diretorio.autenticar("u0", "123").nome == "u0"
+
+
+def test_migrar_senhas_sobe_a_versao_e_e_idempotente():
+    ja_hash = gerar_hash("abc", ITERACOES)
+    migrados, trocadas = migrar_senhas(_usuarios(["123", ja_hash], [1, 4]), ITERACOES)
+    assert trocadas == 1
+    assert migrados["Versao"].tolist() == [2, 4]
+    assert migrados["senha"].iloc[1] == ja_hash
+    assert conferir_senha("123", migrados["senha"].iloc[0])
+
+    de_novo, trocadas = migrar_senhas(migrados, ITERACOES)
+    assert trocadas == 0
+    assert de_novo["senha"].tolist() == migrados["senha"].tolist()
+    assert de_novo["Versao"].tolist() == [2, 4]
+
+
+def test_migrar_senhas_numericas_lidas_como_float():
+    # Coluna numérica com uma célula vazia: o pandas lê 123456 como 123456.0
+    migrados, trocadas = migrar_senhas(_usuarios([123456.0, np.nan]), ITERACOES)
+    assert trocadas == 1
+    assert conferir_senha("123456", migrados["senha"].iloc[0])
+    assert not conferir_senha("123456.0", migrados["senha"].iloc[0])
+    # Senha vazia não vira hash de "nan": continua sem login
+    assert pd.isna(migrados["senha"].iloc[1])
+    assert migrados["Versao"].tolist() == [2, 1]
@@ -0,0 +1,118 @@
+import ast
+import hashlib
+import hmac
+import os
+
+import pandas as pd
+
+# PBKDF2-SHA256; o número de iterações fica gravado em cada hash, então pode subir sem invalidar os antigos
+ALGORITMO = "pbkdf2_sha256"
+ITERACOES = 260000
+
+
+def gerar_hash(senha, iteracoes=ITERACOES, sal=None):
+    """Texto ``algoritmo$iterações$sal$hash`` gravado na coluna senha."""
+    sal = sal or os.urandom(16).hex()
+    calculado = hashlib.pbkdf2_hmac("sha256", str(senha).encode(), bytes.fromhex(sal), iteracoes).hex()
+    return f"{ALGORITMO}${iteracoes}${sal}${calculado}"
+
+
+def eh_hash(valor):
+    return str(valor).startswith(f"{ALGORITMO}$")
+
+
+def conferir_senha(senha, armazenada):
+    """Compara ``senha`` com o hash gravado em tempo constante; senha em texto puro nunca confere."""
+    partes = str(armazenada).split("$")
+    if len(partes) != 4 or partes[0] != ALGORITMO:
+        return False
+    _, iteracoes, sal, esperado = partes
+    calculado = gerar_hash(senha, int(iteracoes), sal).rsplit("$", 1)[1]
+    return hmac.compare_digest(calculado, esperado)
+
+
+# Conferido quando o usuário não existe, para o tempo de resposta não revelar quem está cadastrado
+_HASH_FICTICIO = gerar_hash("")
+
+
+def converter_perfil(perfil_raw):
+    try:
+        res = ast.literal_eval(str(perfil_raw))
+        return res if isinstance(res, list) else [str(perfil_raw)]
+    except (ValueError, SyntaxError):
+        return [str(perfil_raw)]
+
+
+def _senha_em_texto(valor):
+    """Senha como foi digitada na planilha; com células vazias a coluna numérica chega como float."""
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return str(valor).strip()
+
+
+def migrar_senhas(usuarios, iteracoes=ITERACOES):
+    """Cópia de ``usuarios`` com as senhas em texto trocadas por hash, e quantas foram trocadas.
+
+    Senhas que já são hash ficam como estão, então rodar de novo não muda nada;
+    senhas vazias também, e continuam sem conferir no login. A Versao das linhas
+    alteradas sobe, para edições abertas com a senha antiga darem conflito.
+    """
+    usuarios = usuarios.copy()
+    senhas = usuarios["senha"].map(lambda s: "" if pd.isna(s) else _senha_em_texto(s))
+    texto = (senhas != "") & ~senhas.map(eh_hash)
+    usuarios["senha"] = usuarios["senha"].astype(object)
+    usuarios.loc[texto, "senha"] = [gerar_hash(s, iteracoes) for s in senhas[texto]]
+    if "Versao" in usuarios.columns:
+        versoes = usuarios["Versao"].fillna(1).astype(int)
+        usuarios["Versao"] = versoes.where(~texto, versoes + 1)
+    return usuarios, int(texto.sum())
+
+
+class Usuario:
+    """Linha da aba Usuarios já interpretada: perfis como conjunto, sem a senha exposta."""
+
+    __slots__ = ("id", "nome", "setor", "perfis", "versao", "_senha")
+
+    def __init__(self, id, nome, setor, perfis, versao, senha):
+        self.id = id
+        self.nome = nome
+        self.setor = setor
+        self.perfis = frozenset(perfis)
+        self.versao = versao
+        self._senha = senha
+
+
+class Diretorio:
+    """Usuários indexados pelo nome, montados uma vez por versão da aba Usuarios.
+
+    Login, perfis e setor são consultas a dicionário, sem varrer a aba.
+    """
+
+    def __init__(self, usuarios):
+        self._usuarios = {}
+        self._por_setor = {}
+        for linha in usuarios.to_dict("records"):
+            nome = str(linha["usuario"])
+            usuario = Usuario(linha.get("ID"), nome, linha.get("setor"), converter_perfil(linha.get("perfil")),
+                              linha.get("Versao"), linha.get("senha"))
+            self._usuarios[nome] = usuario
+            self._por_setor.setdefault(usuario.setor, []).append(nome)
+
+    def __contains__(self, nome):
+        return nome in self._usuarios
+
+    def __len__(self):
+        return len(self._usuarios)
+
+    def get(self, nome):
+        return self._usuarios.get(nome)
+
+    def nomes(self, setor=None):
+        """Nomes na ordem da aba; com ``setor``, só os daquele setor."""
+        return list(self._usuarios) if setor is None else list(self._por_setor.get(setor, []))
+
+    def autenticar(self, nome, senha):
+        """``Usuario`` cujas credenciais conferem, ou None."""
+        usuario = self._usuarios.get(nome)
+        confere = conferir_senha(senha, usuario._senha if usuario is not None else _HASH_FICTICIO)
+        return usuario if confere and usuario is not None else None